@@ -0,0 +1,351 @@
+import os
+import sys
+import math
+import time
+import random
+from collections import namedtuple, deque
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.spatial import cKDTree
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+from Heuristic import reduce_routes
+
+Individual = namedtuple('Individual', ['giant', 'routes', 'cost'])
+
+
+class HGS(object):
+    """
+    Hybrid genetic search：染色体为不含仓库的巨型路线(giant tour)，用线性时间的Split算法解码成最优的路线划分，
+    子代由OX交叉产生，再用粒度邻域(每个客户的k近邻)内的relocate/swap/2-opt/2-opt*移动做局部搜索(education)
+    种群按目标值和多样性(broken-pairs距离)的排名计算biased fitness，整个种群的评价用NumPy批量完成
+    给定vehicle_count时，Split和局部搜索后路线数超过车辆数的个体先用Heuristic.reduce_routes修复
+    (局部搜索只会减少路线数)，修复失败时目标值中对每条多出的路线加penalty
+    """
+
+    def __init__(self, points_list, vehicle_capacity, vehicle_count=None, population_size=25, generation_size=40,
+                 elite=4, close=5, k=20, seed=0):
+        self.coords = np.array([[p.x, p.y] for p in points_list], dtype=float)
+        self.n = len(points_list)
+        self.demand = [p.demand for p in points_list]
+        self.capacity = vehicle_capacity
+        self.matrix = np.asarray(distance_matrix(self.coords))
+        self.dist = self.matrix.tolist()
+        self.vehicle_count = vehicle_count
+        # 多一条路线的惩罚大于任何可行解的总距离
+        self.penalty = 2 * float(self.matrix[0].max()) * self.n + 1
+        self.population_size = population_size
+        self.generation_size = generation_size
+        self.elite = elite
+        self.close = close
+        self.rng = random.Random(seed)
+        customer = self.coords[1:]
+        k = min(k, self.n - 2)
+        _, nbr = cKDTree(customer).query(customer, k=k + 1)
+        self.neighbors = [[]] + (nbr[:, 1:] + 1).tolist()
+        self.population = []
+        # 局部搜索中的路线状态
+        self.routes, self.route_of, self.pos, self.loads, self.prefix = [], [], [], [], []
+
+    '''
+    (1)Split解码
+    '''
+
+    def split(self, giant):
+        """
+        Split(Vidal 2016)：在巨型路线上求最优的路线切分，
+        p[k] = min_i p[i] + d(0, t[i+1]) + D[k] - D[i+1] + d(t[k], 0)，要求Q[k] - Q[i] <= capacity
+        标签lambda_i = p[i] + d(0, t[i+1]) - D[i+1]在双端队列中保持单调，每个标签只进出一次，总复杂度O(n)
+        """
+        t = [0] + list(giant)
+        m = len(giant)
+        d0 = self.dist[0]
+        step = [0.0, 0.0] + [self.dist[t[i - 1]][t[i]] for i in range(2, m + 1)]
+        D = np.cumsum(step).tolist()
+        Q = np.cumsum([0] + [self.demand[c] for c in giant]).tolist()
+        p = [0.0] * (m + 1)
+        pred = [0] * (m + 1)
+        lam = [0.0] * (m + 1)
+        lam[0] = d0[t[1]] - D[1]
+        queue = deque([0])
+        for k in range(1, m + 1):
+            while Q[k] - Q[queue[0]] > self.capacity:
+                queue.popleft()
+            i = queue[0]
+            p[k] = lam[i] + D[k] + d0[t[k]]
+            pred[k] = i
+            if k < m:
+                lam[k] = p[k] + d0[t[k + 1]] - D[k + 1]
+                while queue and lam[queue[-1]] >= lam[k]:
+                    queue.pop()
+                queue.append(k)
+        routes, k = [], m
+        while k > 0:
+            routes.append(t[pred[k] + 1:k + 1])
+            k = pred[k]
+        return routes[::-1]
+
+    def route_cost(self, route):
+        path = [0] + route + [0]
+        return sum(self.dist[a][b] for a, b in zip(path, path[1:]))
+
+    def make_individual(self, routes):
+        routes = [r for r in routes if r]
+        # 路线按重心极角排序后首尾相接作为新的巨型路线
+        depot = self.coords[0]
+        angle = [math.atan2(*(self.coords[r].mean(axis=0) - depot)[::-1]) for r in routes]
+        routes = [routes[r] for r in sorted(range(len(routes)), key=angle.__getitem__)]
+        giant = [c for r in routes for c in r]
+        return Individual(giant, routes, sum(self.route_cost(r) for r in routes) + self.penalty * self.excess(routes))
+
+    def excess(self, routes):
+        if self.vehicle_count is None:
+            return 0
+        return max(0, len(routes) - self.vehicle_count)
+
+    def repair(self, routes):
+        # 路线数超过车辆数时把载重最小的路线拆开插入其他路线，返回不含仓库的路线
+        if not self.excess(routes):
+            return routes
+        tours = reduce_routes([[0] + r + [0] for r in routes], self.demand, self.capacity, self.vehicle_count,
+                              self.coords)
+        return [t[1:-1] for t in tours]
+
+    '''
+    (2)局部搜索(education)
+    '''
+
+    def load_routes(self, routes):
+        self.routes = [list(r) for r in routes]
+        self.route_of = [0] * self.n
+        self.pos = [0] * self.n
+        self.loads = [0] * len(self.routes)
+        self.prefix = [[] for _ in self.routes]
+        for r in range(len(self.routes)):
+            self.update_route(r)
+
+    def update_route(self, r):
+        # prefix[r][p]为路线r前p+1个客户的载重
+        route = self.routes[r]
+        prefix, total = [], 0
+        for p, c in enumerate(route):
+            self.route_of[c] = r
+            self.pos[c] = p
+            total += self.demand[c]
+            prefix.append(total)
+        self.prefix[r] = prefix
+        self.loads[r] = total
+
+    def prev(self, c):
+        p = self.pos[c]
+        return self.routes[self.route_of[c]][p - 1] if p > 0 else 0
+
+    def next(self, c):
+        route = self.routes[self.route_of[c]]
+        p = self.pos[c]
+        return route[p + 1] if p + 1 < len(route) else 0
+
+    def educate(self, routes):
+        self.load_routes(routes)
+        d = self.dist
+        customers = list(range(1, self.n))
+        improved = True
+        while improved:
+            improved = False
+            self.rng.shuffle(customers)
+            for u in customers:
+                for v in self.neighbors[u]:
+                    if self.relocate(u, v, d) or self.relocate(u, v, d, after=False) or self.swap(u, v, d) \
+                            or self.two_opt(u, v, d) or self.two_opt_star(u, v, d):
+                        improved = True
+                        break
+        return self.routes
+
+    def relocate(self, u, v, d, after=True):
+        # 把u移到v之后(after=True)或之前
+        ru, rv = self.route_of[u], self.route_of[v]
+        pu, nu = self.prev(u), self.next(u)
+        a, b = (v, self.next(v)) if after else (self.prev(v), v)
+        if u in (a, b) or (ru != rv and self.loads[rv] + self.demand[u] > self.capacity):
+            return False
+        delta = d[pu][nu] - d[pu][u] - d[u][nu] + d[a][u] + d[u][b] - d[a][b]
+        if delta > -1e-9:
+            return False
+        self.routes[ru].pop(self.pos[u])
+        self.update_route(ru)
+        self.routes[rv].insert(self.pos[v] + (1 if after else 0), u)
+        self.update_route(rv)
+        return True
+
+    def swap(self, u, v, d):
+        ru, rv = self.route_of[u], self.route_of[v]
+        pu, nu, pv, nv = self.prev(u), self.next(u), self.prev(v), self.next(v)
+        if nu == v or nv == u:
+            return False
+        if ru != rv and (self.loads[ru] - self.demand[u] + self.demand[v] > self.capacity or
+                         self.loads[rv] - self.demand[v] + self.demand[u] > self.capacity):
+            return False
+        delta = d[pu][v] + d[v][nu] + d[pv][u] + d[u][nv] - d[pu][u] - d[u][nu] - d[pv][v] - d[v][nv]
+        if delta > -1e-9:
+            return False
+        self.routes[ru][self.pos[u]], self.routes[rv][self.pos[v]] = v, u
+        self.update_route(ru)
+        if rv != ru:
+            self.update_route(rv)
+        return True
+
+    def two_opt(self, u, v, d):
+        # 同一路线内：以(u,v)和(nu,nv)替换(u,nu)和(v,nv)，即反转nu..v
+        if self.route_of[u] != self.route_of[v]:
+            return False
+        if self.pos[u] > self.pos[v]:
+            u, v = v, u
+        nu, nv = self.next(u), self.next(v)
+        if nu == v:
+            return False
+        delta = d[u][v] + d[nu][nv] - d[u][nu] - d[v][nv]
+        if delta > -1e-9:
+            return False
+        r = self.route_of[u]
+        route = self.routes[r]
+        route[self.pos[nu]:self.pos[v] + 1] = route[self.pos[nu]:self.pos[v] + 1][::-1]
+        self.update_route(r)
+        return True
+
+    def two_opt_star(self, u, v, d):
+        """
+        不同路线间的2-opt*，删除(u,nu)和(v,nv)后有两种重连方式：
+        (1)交换尾部：..u nv..和..v nu..
+        (2)头部相连、尾部相连：..u v..(反向)和..nu(反向) nv..
+        """
+        ru, rv = self.route_of[u], self.route_of[v]
+        if ru == rv:
+            return False
+        nu, nv = self.next(u), self.next(v)
+        head_u, head_v = self.prefix[ru][self.pos[u]], self.prefix[rv][self.pos[v]]
+        tail_u, tail_v = self.loads[ru] - head_u, self.loads[rv] - head_v
+        route_u, route_v = self.routes[ru], self.routes[rv]
+        cut_u, cut_v = self.pos[u] + 1, self.pos[v] + 1
+        if head_u + tail_v <= self.capacity and head_v + tail_u <= self.capacity \
+                and d[u][nv] + d[v][nu] - d[u][nu] - d[v][nv] < -1e-9:
+            self.routes[ru] = route_u[:cut_u] + route_v[cut_v:]
+            self.routes[rv] = route_v[:cut_v] + route_u[cut_u:]
+        elif head_u + head_v <= self.capacity and tail_u + tail_v <= self.capacity \
+                and d[u][v] + d[nu][nv] - d[u][nu] - d[v][nv] < -1e-9:
+            self.routes[ru] = route_u[:cut_u] + route_v[:cut_v][::-1]
+            self.routes[rv] = route_u[cut_u:][::-1] + route_v[cut_v:]
+        else:
+            return False
+        self.update_route(ru)
+        self.update_route(rv)
+        return True
+
+    '''
+    (3)遗传操作与种群管理
+    '''
+
+    def crossover(self, parent1, parent2):
+        # OX交叉：保留parent1的一段，其余按parent2的顺序从该段之后依次填入
+        m = len(parent1)
+        a, b = sorted(self.rng.sample(range(m), 2))
+        child = [0] * m
+        child[a:b + 1] = parent1[a:b + 1]
+        used = set(parent1[a:b + 1])
+        fill = [parent2[(b + 1 + i) % m] for i in range(m)]
+        fill = [c for c in fill if c not in used]
+        for i, c in enumerate(fill):
+            child[(b + 1 + i) % m] = c
+        return child
+
+    def biased_fitness(self):
+        """
+        批量计算biased fitness = 目标值排名 + (1 - elite/P) * 多样性排名
+        多样性为与最近close个个体的平均broken-pairs距离，相邻关系用后继/前驱数组表示并广播比较
+        """
+        size = len(self.population)
+        if size == 1:
+            return np.zeros(1)
+        succ = np.zeros((size, self.n), dtype=np.int32)
+        pred = np.zeros((size, self.n), dtype=np.int32)
+        for a, ind in enumerate(self.population):
+            for route in ind.routes:
+                path = np.array([0] + route + [0])
+                succ[a, path[1:-1]] = path[2:]
+                pred[a, path[1:-1]] = path[:-2]
+        succ, pred = succ[:, 1:], pred[:, 1:]
+        broken = ((succ[:, None, :] != succ[None, :, :]) & (succ[:, None, :] != pred[None, :, :])).mean(axis=2)
+        np.fill_diagonal(broken, np.inf)
+        close = min(self.close, size - 1)
+        diversity = np.sort(broken, axis=1)[:, :close].mean(axis=1)
+        cost = np.array([ind.cost for ind in self.population])
+        cost_rank = np.argsort(np.argsort(cost, kind='stable'), kind='stable') / (size - 1)
+        div_rank = np.argsort(np.argsort(-diversity, kind='stable'), kind='stable') / (size - 1)
+        return cost_rank + (1 - self.elite / size) * div_rank
+
+    def select_survivors(self):
+        # 先删除重复个体，再按biased fitness删除最差个体，直到种群规模回到population_size
+        while len(self.population) > self.population_size:
+            seen, clone = set(), None
+            for a, ind in enumerate(self.population):
+                key = tuple(sorted(tuple(r) for r in ind.routes))
+                if key in seen:
+                    clone = a
+                    break
+                seen.add(key)
+            if clone is None:
+                fitness = self.biased_fitness()
+                clone = int(np.argmax(fitness))
+            self.population.pop(clone)
+
+    def tournament(self, fitness):
+        a, b = self.rng.randrange(len(fitness)), self.rng.randrange(len(fitness))
+        return self.population[a if fitness[a] <= fitness[b] else b]
+
+    def add(self, giant):
+        ind = self.make_individual(self.educate(self.repair(self.split(giant))))
+        self.population.append(ind)
+        if len(self.population) >= self.population_size + self.generation_size:
+            self.select_survivors()
+        return ind
+
+    def solve(self, time_limit=30, max_no_improve=2000, verbose=True):
+        start = time.time()
+        customers = list(range(1, self.n))
+        best = None
+        for _ in range(self.population_size):
+            self.rng.shuffle(customers)
+            ind = self.add(list(customers))
+            if best is None or ind.cost < best.cost - 1e-9:
+                best = ind
+        iteration, no_improve = 0, 0
+        while no_improve < max_no_improve and time.time() - start < time_limit:
+            fitness = self.biased_fitness()
+            child = self.crossover(self.tournament(fitness).giant, self.tournament(fitness).giant)
+            ind = self.add(child)
+            iteration += 1
+            no_improve += 1
+            if ind.cost < best.cost - 1e-9:
+                best, no_improve = ind, 0
+                if verbose:
+                    print(f'iteration {iteration}, time {time.time() - start:.1f}s, vehicles {len(best.routes)}, '
+                          f'best:{best.cost}')
+        if self.excess(best.routes):
+            print(f'warning: best solution uses {len(best.routes)} routes, more than {self.vehicle_count} vehicles')
+        return [[0] + r + [0] for r in best.routes], sum(self.route_cost(r) for r in best.routes)
+
+
+def draw(tours, points_list):
+    for sub in tours:
+        for i in range(len(sub)-1):
+            plt.plot([points_list[sub[i]].x, points_list[sub[i+1]].x], [points_list[sub[i]].y, points_list[sub[i+1]].y], c='red')
+            plt.scatter(points_list[sub[i]].x, points_list[sub[i]].y, c='black')
+    plt.show()
+
+
+if __name__ == '__main__':
+    from MTZ_VRP import read
+    path = sys.argv[1] if len(sys.argv) > 1 else './vrp_21_4_1'
+    points_cnt, vehicle_cnt, vehicle_cap, points_ls = read(path)
+    opt_tours, opt_cost = HGS(points_ls, vehicle_cap, vehicle_cnt).solve(time_limit=10)
+    print(f'vehicles {len(opt_tours)}, length {opt_cost}')
+    draw(opt_tours, points_ls)
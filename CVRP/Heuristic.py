@@ -0,0 +1,175 @@
+import os
+import sys
+import math
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+def get_coords(points_list):
+    return np.array([[p.x, p.y] for p in points_list], dtype=float)
+
+
+def savings(points_list, vehicle_capacity, vehicle_count=None, k=None):
+    """
+    Clarke-Wright节约算法：每个客户单独成一条路线，按节约值s_ij = d_0i + d_0j - d_ij从大到小合并路线端点
+    节约值只对每个客户的k个近邻计算(k=None时客户数不超过300用全部客户对，否则取40)，向量化计算后一次排序；
+    路线是无向的，客户度数<2即为端点，用并查集记录所属路线、载重和两个端点，每次合并O(1)
+    给定vehicle_count且路线数超出时，再把载重最小的路线拆开插入其他路线
+    返回与MTZ_VRP.MIP_model相同格式的vehicle_tours，即[0, ..., 0]的列表
+    """
+    coords = get_coords(points_list)
+    n = len(points_list)
+    demand = [p.demand for p in points_list]
+    if n <= 2:
+        return [[0, i, 0] for i in range(1, n)]
+    if k is None:
+        k = n - 2 if n <= 301 else 40
+    k = min(k, n - 2)
+    # 候选客户对(i<j)及其节约值
+    customer = coords[1:]
+    _, nbr = cKDTree(customer).query(customer, k=k + 1)
+    pairs = np.column_stack([np.repeat(np.arange(n - 1), k), nbr[:, 1:].ravel()])
+    pairs = np.unique(np.sort(pairs, axis=1), axis=0) + 1
+    depot = np.linalg.norm(coords - coords[0], axis=1)
+    value = depot[pairs[:, 0]] + depot[pairs[:, 1]] - np.linalg.norm(coords[pairs[:, 0]] - coords[pairs[:, 1]], axis=1)
+    pairs = pairs[np.argsort(-value, kind='stable')].tolist()
+
+    parent = list(range(n))
+    load = demand[:]
+    ends = [(i, i) for i in range(n)]
+    adj = [[] for _ in range(n)]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in pairs:
+        if len(adj[i]) == 2 or len(adj[j]) == 2:
+            continue
+        a, b = find(i), find(j)
+        if a == b or load[a] + load[b] > vehicle_capacity:
+            continue
+        # 合并后的路线端点为两条路线各自的另一端
+        other_a = ends[a][1] if ends[a][0] == i else ends[a][0]
+        other_b = ends[b][1] if ends[b][0] == j else ends[b][0]
+        adj[i].append(j)
+        adj[j].append(i)
+        parent[b] = a
+        load[a] += load[b]
+        ends[a] = (other_a, other_b)
+
+    tours = []
+    for r in range(1, n):
+        if find(r) != r:
+            continue
+        tour, prev, cur = [0], -1, ends[r][0]
+        while cur != -1:
+            tour.append(cur)
+            nxt = [j for j in adj[cur] if j != prev]
+            prev, cur = cur, (nxt[0] if nxt else -1)
+        tours.append(tour + [0])
+    if vehicle_count is not None:
+        tours = reduce_routes(tours, demand, vehicle_capacity, vehicle_count, coords)
+    return tours
+
+
+def sweep(points_list, vehicle_capacity, vehicle_count=None):
+    """
+    扫描算法：客户按相对仓库的极角排序，从最大的角度间隔处开始依次装车，载重超出时开启新路线
+    每条路线内用最便宜插入确定访问顺序
+    """
+    coords = get_coords(points_list)
+    demand = [p.demand for p in points_list]
+    angle = np.arctan2(coords[1:, 1] - coords[0, 1], coords[1:, 0] - coords[0, 0])
+    order = np.argsort(angle, kind='stable')
+    if len(order) > 1:
+        ordered = angle[order]
+        gap = np.diff(np.append(ordered, ordered[0] + 2 * math.pi))
+        order = np.roll(order, -int((np.argmax(gap) + 1) % len(order)))
+    groups, total = [[]], 0
+    for c in (order + 1).tolist():
+        if groups[-1] and total + demand[c] > vehicle_capacity:
+            groups.append([])
+            total = 0
+        groups[-1].append(c)
+        total += demand[c]
+    tours = [cheapest_insertion(group, coords) for group in groups if group]
+    if vehicle_count is not None:
+        tours = reduce_routes(tours, demand, vehicle_capacity, vehicle_count, coords)
+    return tours
+
+
+def cheapest_insertion(group, coords):
+    tour = [0, 0]
+    for c in group:
+        tour.insert(best_position(tour, c, coords)[1], c)
+    return tour
+
+
+def best_position(tour, c, coords):
+    # 返回(增加的距离, 插入位置)
+    t = np.array(tour)
+    before = np.linalg.norm(coords[t[:-1]] - coords[c], axis=1)
+    after = np.linalg.norm(coords[t[1:]] - coords[c], axis=1)
+    edge = np.linalg.norm(coords[t[:-1]] - coords[t[1:]], axis=1)
+    cost = before + after - edge
+    p = int(np.argmin(cost))
+    return float(cost[p]), p + 1
+
+
+def reduce_routes(tours, demand, vehicle_capacity, vehicle_count, coords):
+    # 每次取载重最小的路线，把其中的客户按需求从大到小插入其他路线的最便宜可行位置，全部插入成功才删除该路线
+    tours = [list(t) for t in tours]
+    while len(tours) > vehicle_count:
+        loads = [sum(demand[i] for i in t) for t in tours]
+        small = min(range(len(tours)), key=loads.__getitem__)
+        rest = [list(t) for r, t in enumerate(tours) if r != small]
+        rest_loads = [load for r, load in enumerate(loads) if r != small]
+        for c in sorted(tours[small][1:-1], key=lambda i: -demand[i]):
+            best = None
+            for r, t in enumerate(rest):
+                if rest_loads[r] + demand[c] > vehicle_capacity:
+                    continue
+                cost, p = best_position(t, c, coords)
+                if best is None or cost < best[0]:
+                    best = (cost, r, p)
+            if best is None:
+                return pack_routes(tours, demand, vehicle_capacity, vehicle_count, coords)
+            _, r, p = best
+            rest[r].insert(p, c)
+            rest_loads[r] += demand[c]
+        tours = rest
+    return tours
+
+
+def pack_routes(tours, demand, vehicle_capacity, vehicle_count, coords):
+    # 路线插入失败时按需求做best-fit decreasing装箱，每辆车内按最便宜插入排序；装不下时返回原路线
+    customers = sorted((i for t in tours for i in t[1:-1]), key=lambda i: -demand[i])
+    bins, loads = [[] for _ in range(vehicle_count)], [0] * vehicle_count
+    for c in customers:
+        fits = [r for r in range(vehicle_count) if loads[r] + demand[c] <= vehicle_capacity]
+        if not fits:
+            return tours
+        r = max(fits, key=loads.__getitem__)
+        bins[r].append(c)
+        loads[r] += demand[c]
+    return [cheapest_insertion(group, coords) for group in bins if group]
+
+
+def tours_length(tours, points_list):
+    coords = get_coords(points_list)
+    return float(sum(np.linalg.norm(coords[t[1:]] - coords[t[:-1]], axis=1).sum() for t in tours))
+
+
+if __name__ == '__main__':
+    sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+    from MTZ_VRP import read
+    path = sys.argv[1] if len(sys.argv) > 1 else './vrp_21_4_1'
+    points_cnt, vehicle_cnt, vehicle_cap, points_ls = read(path)
+    for name, method in (('savings', savings), ('sweep', sweep)):
+        t0 = time.time()
+        tours = method(points_ls, vehicle_cap, vehicle_cnt)
+        print(f'{name}: vehicles {len(tours)}, length {tours_length(tours, points_ls)}, time {time.time() - t0:.2f}s')
@@ -1,17 +1,18 @@
+import os
+import sys
 from collections import namedtuple, defaultdict
 import gurobipy as gp
 from gurobipy import GRB
-import math
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+from Common.WarmStart import set_start, incumbent_callback, report
+from Heuristic import savings
 
 
 Customer = namedtuple("Customer", ['index', 'demand', 'x', 'y'])
 
 
-def length(point1, point2):
-    return math.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2)
-
-
 def read(path):
     with open(path, 'r') as file:
         data = file.read()
@@ -26,14 +27,15 @@ def read(path):
     return points_count, vehicle_count, vehicle_capacity, points_list
 
 
-def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list):
+def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list, warm_start=False):
     """
     (1)已知数据
     """
     points = [i for i in range(points_count)]
     customers = [i for i in range(1, points_count)]
     edges = [(i, j) for i in range(points_count) for j in range(points_count) if i != j]
-    distance = {(i, j): length(points_list[i], points_list[j]) for i, j in edges}
+    matrix = distance_matrix([(p.x, p.y) for p in points_list])
+    distance = {(i, j): float(matrix[i, j]) for i, j in edges}
     """
     (2)决策变量和目标函数
     """
@@ -60,7 +62,21 @@ def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list):
     """
     (4)求解模型
     """
-    model.optimize()
+    # warm start：节约算法的路线作为MIP start，flow取路线上的累计需求
+    if warm_start:
+        arcs, loads = {}, {}
+        for tour in savings(points_list, vehicle_capacity, vehicle_count):
+            total = 0
+            for i, j in zip(tour, tour[1:]):
+                arcs[i, j] = 1
+                if j != 0:
+                    total += points_list[j].demand
+                    loads[j] = total
+        set_start(select, arcs)
+        set_start(flow, loads)
+    model._incumbents = []
+    model.optimize(incumbent_callback)
+    report(model, 'warm start' if warm_start else 'cold start')
     arcs = [e for e in edges if select[e].x > 0.99]
     print(arcs)
     hash_table = defaultdict(list)
@@ -78,17 +94,19 @@ def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list):
     return vehicle_tours
 
 
-path = './vrp_16_3_1'
-points_cnt, vehicle_cnt, vehicle_cap, points_ls = read(path)
-opt_tours = MIP_model(points_cnt, vehicle_cnt, vehicle_cap, points_ls)
-
-
-def draw(tours):
+def draw(tours, points_list):
     for sub in tours:
         for i in range(len(sub)-1):
-            plt.plot([points_ls[sub[i]].x, points_ls[sub[i+1]].x], [points_ls[sub[i]].y, points_ls[sub[i+1]].y], c='red')
-            plt.scatter(points_ls[sub[i]].x, points_ls[sub[i]].y, c='black')
+            plt.plot([points_list[sub[i]].x, points_list[sub[i+1]].x], [points_list[sub[i]].y, points_list[sub[i+1]].y], c='red')
+            plt.scatter(points_list[sub[i]].x, points_list[sub[i]].y, c='black')
     plt.show()
 
 
-draw(opt_tours)
\ No newline at end of file
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else './vrp_16_3_1'
+    points_cnt, vehicle_cnt, vehicle_cap, points_ls = read(path)
+    # 分别求解有无warm start的模型，对比找到好解和证明最优的时间
+    MIP_model(points_cnt, vehicle_cnt, vehicle_cap, points_ls)
+    opt_tours = MIP_model(points_cnt, vehicle_cnt, vehicle_cap, points_ls, warm_start=True)
+    draw(opt_tours, points_ls)
+
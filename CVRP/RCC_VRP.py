@@ -0,0 +1,193 @@
+import os
+import sys
+import math
+from collections import defaultdict
+import gurobipy as gp
+from gurobipy import GRB
+import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+from Common.WarmStart import set_start, record_incumbent, report
+from MTZ_VRP import read
+from Heuristic import savings
+
+
+def RCC_model(points_count, vehicle_count, vehicle_capacity, points_list, warm_start=False, max_cut_rounds=50):
+    """
+    两下标弧变量 + rounded capacity inequalities：
+    对客户集合S，进入S的弧流量 >= ceil(d(S)/Q)，同时消除子圈和超载路线
+    约束数量是指数级的，在callback中对整数解(lazy constraint)和分数解(user cut)分离，
+    分数解只在根节点分离，且最多max_cut_rounds轮
+    """
+    """
+    (1)已知数据
+    """
+    customers = [i for i in range(1, points_count)]
+    edges = [(i, j) for i in range(points_count) for j in range(points_count) if i != j]
+    matrix = distance_matrix([(p.x, p.y) for p in points_list])
+    distance = {(i, j): float(matrix[i, j]) for i, j in edges}
+    """
+    (2)决策变量和目标函数
+    """
+    model = gp.Model('CVRP-RCC')
+    select = model.addVars(edges, vtype=GRB.BINARY, name='select')
+    model.setObjective(select.prod(distance), GRB.MINIMIZE)
+    """
+    (3)约束条件
+    """
+    # 每个客户点一条出边和入边
+    model.addConstrs(select.sum(i, '*') == 1 for i in customers)
+    model.addConstrs(select.sum('*', j) == 1 for j in customers)
+    # 车辆数量约束，且从仓库出发的车辆都回到仓库
+    model.addConstr(select.sum(0, '*') <= vehicle_count)
+    model.addConstr(select.sum(0, '*') == select.sum('*', 0))
+    # 单个客户的容量约束不会被违反，先加入两个客户之间的2-cycle约束加强初始LP
+    model.addConstrs(select[i, j] + select[j, i] <= 1 for i, j in edges if 0 < i < j)
+    """
+    (4)求解模型
+    """
+    if warm_start:
+        set_start(select, {(i, j): 1 for tour in savings(points_list, vehicle_capacity, vehicle_count)
+                           for i, j in zip(tour, tour[1:])})
+    model._vars = select
+    model._edges = edges
+    model._customers = customers
+    model._demand = [p.demand for p in points_list]
+    model._capacity = vehicle_capacity
+    model._incumbents = []
+    model._cut_rounds = 0
+    model._max_cut_rounds = max_cut_rounds
+    model.Params.lazyConstraints = 1
+    model.Params.preCrush = 1
+    model.optimize(capacity_cut)
+    report(model, 'warm start' if warm_start else 'cold start')
+    arcs = [e for e in edges if select[e].x > 0.99]
+    hash_table = defaultdict(list)
+    for e in arcs:
+        hash_table[e[0]].append(e[1])
+    vehicle_tours = []
+    for k in range(len(hash_table[0])):
+        vehicle_tours.append([])
+        vehicle_tours[k].append(0)
+        vehicle_tours[k].append(hash_table[0][k])
+        last = vehicle_tours[k][-1]
+        while last != 0:
+            vehicle_tours[k].append(hash_table[last][0])
+            last = vehicle_tours[k][-1]
+    return vehicle_tours
+
+
+# rounded capacity cuts：callback + lazy constraints(整数解) + user cuts(分数解)
+def capacity_cut(model, where):
+    if where == GRB.Callback.MIPSOL:
+        values = model.cbGetSolution(model._vars)
+        support = {e: values[e] for e in model._edges if values[e] > 0.5}
+        cuts = separate_capacity(support, model._customers, model._demand, model._capacity)
+        if not cuts:
+            record_incumbent(model, model.cbGet(GRB.Callback.MIPSOL_OBJ))
+        for side, rhs in cuts:
+            model.cbLazy(cut_expr(model, side) >= rhs)
+    # 分数解分离只在根节点进行，并限制轮数，避免分支定界的大部分时间花在分离上
+    elif where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL \
+            and model.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0 and model._cut_rounds < model._max_cut_rounds:
+        model._cut_rounds += 1
+        values = model.cbGetNodeRel(model._vars)
+        support = {e: values[e] for e in model._edges if values[e] > 1e-6}
+        for side, rhs in separate_capacity(support, model._customers, model._demand, model._capacity):
+            model.cbCut(cut_expr(model, side) >= rhs)
+
+
+def cut_expr(model, side):
+    # 进入集合S的弧流量
+    return gp.quicksum(model._vars[i, j] for j in side for i in [0] + model._customers if i not in side)
+
+
+def inflow(support, side):
+    return sum(v for (i, j), v in support.items() if j in side and i not in side)
+
+
+def components(support, customers):
+    # 去掉仓库后支撑图(无向)的连通分量
+    parent = {i: i for i in customers}
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for i, j in support:
+        if i != 0 and j != 0:
+            parent[find(i)] = find(j)
+    groups = defaultdict(set)
+    for i in customers:
+        groups[find(i)].add(i)
+    return list(groups.values())
+
+
+def separate_capacity(support, customers, demand, capacity, eps=1e-4, max_cuts=50):
+    """
+    分离违反的rounded capacity inequalities，返回[(S, ceil(d(S)/Q))]
+    (1)连通分量：去掉仓库后的每个连通分量S都检查一次，整数解时即为全部违反的路线或子圈；
+    (2)收缩启发式：从每个客户出发，每次加入与当前集合连接流量最大的客户，扩张过程中每个集合都检查一次
+    """
+    cuts, seen = [], set()
+
+    def check(side):
+        key = frozenset(side)
+        if key in seen:
+            return
+        seen.add(key)
+        rhs = math.ceil(sum(demand[i] for i in side) / capacity - 1e-9)
+        if inflow(support, side) < rhs - eps:
+            cuts.append((key, rhs))
+
+    groups = components(support, customers)
+    for group in groups:
+        check(group)
+    if cuts or len(support) == 0:
+        return cuts[:max_cuts]
+
+    # 分数解：客户之间的对称连接权重
+    weight = defaultdict(float)
+    for (i, j), v in support.items():
+        if i != 0 and j != 0:
+            weight[i, j] += v
+            weight[j, i] += v
+    adj = defaultdict(set)
+    for i, j in weight:
+        adj[i].add(j)
+    for seed in customers:
+        side = {seed}
+        link = defaultdict(float)
+        for j in adj[seed]:
+            link[j] += weight[seed, j]
+        while len(cuts) < max_cuts:
+            candidates = [j for j in link if j not in side]
+            if not candidates:
+                break
+            best = max(candidates, key=link.__getitem__)
+            side.add(best)
+            for j in adj[best]:
+                link[j] += weight[best, j]
+            check(side)
+        if len(cuts) >= max_cuts:
+            break
+    return cuts
+
+
+def draw(tours, points_list):
+    for sub in tours:
+        for i in range(len(sub)-1):
+            plt.plot([points_list[sub[i]].x, points_list[sub[i+1]].x], [points_list[sub[i]].y, points_list[sub[i+1]].y], c='red')
+            plt.scatter(points_list[sub[i]].x, points_list[sub[i]].y, c='black')
+    plt.show()
+
+
+if __name__ == '__main__':
+    path = sys.argv[1] if len(sys.argv) > 1 else './vrp_21_4_1'
+    points_cnt, vehicle_cnt, vehicle_cap, points_ls = read(path)
+    opt_tours = RCC_model(points_cnt, vehicle_cnt, vehicle_cap, points_ls, warm_start=True)
+    for i, t in enumerate(opt_tours):
+        print(f'route{i}:{t}', end='\n')
+    draw(opt_tours, points_ls)
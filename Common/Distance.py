@@ -0,0 +1,72 @@
+"""
+Shared distance matrices for all routing problems
+author：carrot
+time：10/1/2023
+"""
+import os
+import hashlib
+import numpy as np
+
+# 磁盘缓存默认关闭，设置环境变量ROUTING_CACHE_DIR时才缓存到该目录(缓存不会自动清理，5000个点的矩阵约200MB)
+CACHE_DIR = os.environ.get('ROUTING_CACHE_DIR') or None
+EARTH_RADIUS = 6371
+
+
+def euclidean_rows(coords, start, end):
+    diff = coords[start:end, None, :] - coords[None, :, :]
+    return np.sqrt((diff ** 2).sum(axis=-1))
+
+
+def haversine_rows(coords, start, end):
+    # coords每行为(经度, 纬度)，单位为度，结果单位为千米
+    rad = np.radians(coords)
+    lng1, lat1 = rad[start:end, 0][:, None], rad[start:end, 1][:, None]
+    lng2, lat2 = rad[None, :, 0], rad[None, :, 1]
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+METRICS = {
+    'euclidean': euclidean_rows,
+    'haversine': haversine_rows,
+}
+
+
+def fill_matrix(out, coords, metric='euclidean', chunk=2048):
+    # 按行分块广播计算，峰值内存为chunk*n而不是n*n
+    rows = METRICS[metric]
+    for start in range(0, len(coords), chunk):
+        end = min(start + chunk, len(coords))
+        out[start:end] = rows(coords, start, end)
+    return out
+
+
+def instance_hash(coords, metric='euclidean', dtype=np.float64):
+    coords = np.ascontiguousarray(coords, dtype=np.float64)
+    digest = hashlib.sha1()
+    digest.update(f'{metric}|{np.dtype(dtype).str}|{coords.shape}'.encode())
+    digest.update(coords.tobytes())
+    return digest.hexdigest()
+
+
+def distance_matrix(coords, metric='euclidean', dtype=np.float64, cache_dir=CACHE_DIR, chunk=2048):
+    """
+    计算距离矩阵，metric为'euclidean'或'haversine'(坐标为经度、纬度)
+    cache_dir不为None时按实例内容哈希缓存到磁盘，并以只读内存映射的方式返回，重复运行时不再计算，
+    大矩阵也不需要全部载入内存
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    n = len(coords)
+    if cache_dir is None:
+        return fill_matrix(np.empty((n, n), dtype=dtype), coords, metric, chunk)
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, instance_hash(coords, metric, dtype) + '.npy')
+    if not os.path.exists(path):
+        # 先写临时文件再重命名，避免并行运行时读到写了一半的缓存
+        temp = f'{path}.{os.getpid()}.tmp'
+        out = np.lib.format.open_memmap(temp, mode='w+', dtype=dtype, shape=(n, n))
+        fill_matrix(out, coords, metric, chunk)
+        out.flush()
+        del out
+        os.replace(temp, path)
+    return np.load(path, mmap_mode='r')
@@ -0,0 +1,58 @@
+"""
+MIP start helpers and incumbent timing for the Gurobi models
+author：carrot
+time：10/1/2023
+"""
+from gurobipy import GRB
+
+
+def set_start(variables, values):
+    # variables为tupledict，values为{key: 初始值}，未给出的变量初值为0
+    for key, var in variables.items():
+        var.Start = values.get(key, 0)
+
+
+def record_incumbent(model, objective):
+    # 记录每次得到更好整数解的时间，用于比较有无warm start时找到好解的速度
+    # 同一个模型多次optimize时(如稀疏TSP加边后重新求解)，_runtime_offset为之前各次求解的累计用时
+    history = model._incumbents
+    if not history or objective < history[-1][1] - 1e-9:
+        history.append((getattr(model, '_runtime_offset', 0.0) + model.cbGet(GRB.Callback.RUNTIME), objective))
+
+
+def record_root_bound(model):
+    # 根节点每轮割平面后都会回调，保留最后一次的下界
+    if model.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0:
+        model._root_bound = model.cbGet(GRB.Callback.MIPNODE_OBJBND)
+
+
+def incumbent_callback(model, where):
+    if where == GRB.Callback.MIPSOL:
+        record_incumbent(model, model.cbGet(GRB.Callback.MIPSOL_OBJ))
+    elif where == GRB.Callback.MIPNODE:
+        record_root_bound(model)
+
+
+def report(model, label, tolerance=0.01):
+    """
+    输出首个整数解的时间、找到与最终目标值相差tolerance以内的解的时间、总用时和根节点下界
+    总用时包含_runtime_offset，与记录整数解时间的时钟一致；未证明最优时(如达到时间限制)按状态标注
+    """
+    history = model._incumbents
+    root = getattr(model, '_root_bound', None)
+    runtime = getattr(model, '_runtime_offset', 0.0) + model.Runtime
+    if model.Status == GRB.OPTIMAL:
+        status = 'proven optimum'
+    elif model.Status == GRB.TIME_LIMIT:
+        status = 'time limit'
+    else:
+        status = f'status {model.Status}'
+    if model.SolCount == 0:
+        print(f'{label}: no incumbent, {status} {runtime:.2f}s' + (f', root bound {root}' if root is not None else ''))
+        return
+    final = model.ObjVal
+    first = history[0][0] if history else 0.0
+    good = next((t for t, obj in history if obj <= final * (1 + tolerance) + 1e-9), first)
+    print(f'{label}: first incumbent {first:.2f}s, within {tolerance:.0%} {good:.2f}s, '
+          f'{status} {runtime:.2f}s, objective {final}'
+          + (f', root bound {root}' if root is not None else ''))
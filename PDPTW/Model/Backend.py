@@ -0,0 +1,32 @@
+from pulp import GUROBI, GUROBI_CMD, HiGHS, PULP_CBC_CMD
+
+from InFileField import SolveConfig
+
+# gurobi和highs通过Python API在进程内传递模型，不写LP/MPS文件也不启动子进程；
+# cbc为PuLP自带的开源求解器，仍通过文件和子进程求解，只在前两者都不可用时使用
+BACKENDS = {
+    'gurobi': GUROBI,
+    'highs': HiGHS,
+    'cbc': PULP_CBC_CMD,
+    'gurobi_cmd': GUROBI_CMD,
+}
+AUTO_ORDER = ['gurobi', 'highs', 'cbc']
+
+
+def create_backend(name=SolveConfig.Backend, time_limit=SolveConfig.TimeLimit, msg=True):
+    """
+    返回PuLP求解器对象，name为auto时按AUTO_ORDER选择第一个可用的后端
+    """
+    if name == 'auto':
+        for candidate in AUTO_ORDER:
+            backend = create_backend(candidate, time_limit, msg)
+            if backend.available():
+                return backend
+        raise RuntimeError(f'no solver backend available in {AUTO_ORDER}')
+    if name not in BACKENDS:
+        raise ValueError(f'unknown backend {name}, expected one of {["auto"] + list(BACKENDS)}')
+    if name == 'gurobi':
+        return GUROBI(msg=msg, timeLimit=time_limit, **{SolveConfig.Heuristic: SolveConfig.HeuristicTime})
+    if name == 'gurobi_cmd':
+        return GUROBI_CMD(msg=msg, timeLimit=time_limit, options=[(SolveConfig.Heuristic, SolveConfig.HeuristicTime)])
+    return BACKENDS[name](msg=msg, timeLimit=time_limit)
@@ -0,0 +1,84 @@
+import os
+import sys
+import time
+import random
+import tempfile
+from datetime import datetime, timedelta
+import pandas as pd
+
+from System import System
+from SolverPuLP import Solver
+from InFileField import InLocaFD, InVehFD, InOrderFD
+
+
+def generate(path, order_count, location_count=30, seed=0):
+    """
+    生成与PDPTWData.xls格式相同的随机算例：3辆车(匹配关系a、b、a,b)，订单随机匹配a或b
+    """
+    rng = random.Random(seed)
+    base = datetime(2017, 1, 6, 7, 0)
+    locations = pd.DataFrame({
+        InLocaFD.ID: [f'L{i + 1}' for i in range(location_count)],
+        InLocaFD.Latitude: [31.2 + rng.random() * 0.1 for _ in range(location_count)],
+        InLocaFD.Longitude: [121.4 + rng.random() * 0.2 for _ in range(location_count)],
+    })
+    vehicles = pd.DataFrame({
+        InVehFD.ID: ['V1', 'V2', 'V3'],
+        InVehFD.Origin: ['L1'] * 3,
+        InVehFD.Des: ['L1'] * 3,
+        InVehFD.EarliestStart: [base] * 3,
+        InVehFD.LatestEnd: [base + timedelta(hours=22)] * 3,
+        InVehFD.MaxDist: [600] * 3,
+        InVehFD.MaxTime: [20] * 3,
+        InVehFD.Match: ['a', 'b', 'a,b'],
+        InVehFD.Speed: [30] * 3,
+        InVehFD.Load: [25, 20, 10],
+        InVehFD.UnitCost: [7, 6, 5],
+    })
+    rows = []
+    for k in range(order_count):
+        pick_open = base + timedelta(minutes=rng.randrange(0, 600, 30))
+        del_open = pick_open + timedelta(minutes=rng.randrange(60, 240, 30))
+        rows.append({
+            InOrderFD.ID: f'O{k + 1}',
+            InOrderFD.Match: rng.choice('ab'),
+            InOrderFD.Quantity: rng.randint(1, 10),
+            InOrderFD.PickLoca: f'L{rng.randint(1, location_count)}',
+            InOrderFD.PickService: 10,
+            InOrderFD.PickStart: pick_open,
+            InOrderFD.PickEnd: pick_open + timedelta(hours=4),
+            InOrderFD.DelLoca: f'L{rng.randint(1, location_count)}',
+            InOrderFD.DelService: 10,
+            InOrderFD.DelStart: del_open,
+            InOrderFD.DelEnd: del_open + timedelta(hours=4),
+        })
+    with pd.ExcelWriter(path) as writer:
+        locations.to_excel(writer, sheet_name='location', index=False)
+        vehicles.to_excel(writer, sheet_name='vehicle', index=False)
+        pd.DataFrame(rows).to_excel(writer, sheet_name='order', index=False)
+
+
+def measure(system):
+    # 分阶段记录建模用时，不求解
+    solver = Solver(system)
+    solver.create_model()
+    timing = {}
+    for name, step in (('vars', solver.add_vars), ('objs', solver.add_objs), ('cons', solver.add_cons)):
+        start = time.perf_counter()
+        step()
+        timing[name] = time.perf_counter() - start
+    return len(solver.x_vars), len(solver.model.constraints), timing
+
+
+if __name__ == '__main__':
+    # 参数：订单数列表，默认10 25 50 100 200
+    sizes = [int(a) for a in sys.argv[1:]] or [10, 25, 50, 100, 200]
+    with tempfile.TemporaryDirectory() as folder:
+        for order_count in sizes:
+            path = os.path.join(folder, f'orders_{order_count}.xlsx')
+            generate(path, order_count)
+            arcs, cons, timing = measure(System(path, cache_dir=None))
+            total = sum(timing.values())
+            print(f'orders {order_count}: arcs {arcs}, constraints {cons}, vars {timing["vars"]:.2f}s, '
+                  f'objs {timing["objs"]:.2f}s, cons {timing["cons"]:.2f}s, '
+                  f'total {total:.2f}s, {total / arcs * 1e6:.1f}us/arc')
@@ -34,6 +34,10 @@ class InOrderFD:
 
 class SolveConfig:
     Heuristic = 'NoRelHeurTime'
+    HeuristicTime = 400
+    TimeLimit = 600
+    # 求解后端：auto按gurobi、highs、cbc的顺序选择第一个可用的
+    Backend = 'auto'
 
 
 class PDtype(Enum):
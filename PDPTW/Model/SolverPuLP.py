@@ -1,30 +1,62 @@
+import sys
+import numpy as np
 import pandas as pd
 from pulp import *
 import networkx as nx
 import matplotlib.pyplot as plt
 from collections import defaultdict
 from datetime import timedelta
-from typing import Dict
+from time import perf_counter
+from typing import Dict, Optional
 
 from System import System
 from InFileField import SolveConfig, PDtype
+from Backend import create_backend
 
 
 class Solver:
-    def __init__(self, system: System):
+    def __init__(self, system: System, backend: str = SolveConfig.Backend, export_lp: Optional[str] = None,
+                 prune: bool = True, big_m: str = 'arc'):
         self.system = system
+        # 求解后端名称(见Backend.BACKENDS)，export_lp为LP文件路径，仅调试时导出
+        self.backend = backend
+        self.export_lp = export_lp
+        # 是否在建立变量前删除不可能使用的弧，见prune_arcs
+        self.prune = prune
+        # big-M的取法：arc按弧计算(见compute_big_m)，global为原来的时间2 * end、载重2 * max_load，用于对比
+        if big_m not in ('arc', 'global'):
+            raise ValueError(f"unknown big_m {big_m}, expected 'arc' or 'global'")
+        self.big_m = big_m
         self.x_vars: Dict = {}
         self.a_vars: Dict = {}
         self.q_vars: Dict = {}
         self.w_vars: Dict = {}
         self.objs: float = 0
+        # 每条弧(k,i,j)的时间和载重约束的big-M
+        self.time_big_m: Dict = {}
+        self.load_big_m: Dict = {}
+        # 车辆k视角下虚拟点 -> 停靠点编号的数组，每条弧(k,i,j)的距离和运输耗时(秒)，在compute_arc_data中计算
+        self.node_loca: Dict[str, np.ndarray] = {}
+        self.arc_dist: Dict = {}
+        self.travel_time: Dict = {}
+        # LP松弛的下界(根节点割平面之前)和MIP求解用时，在solve_model中记录
+        self.root_bound: Optional[float] = None
+        self.solve_time: float = 0
+        # 每个(k,i)的get_node_info结果，在compute_big_m中计算
+        self.node_info: Dict = {}
+        # 弧索引：(k,i)->车辆k从i出发的弧(k,i,j)列表，(k,j)->车辆k进入j的弧列表，在add_edge_var中一次建立
+        self.out_arcs: Dict[tuple, list] = defaultdict(list)
+        self.in_arcs: Dict[tuple, list] = defaultdict(list)
 
     def run(self):
+        self.build_model()
+        self.solve_model()
+
+    def build_model(self):
         self.create_model()
         self.add_vars()
         self.add_objs()
         self.add_cons()
-        self.solve_model()
 
     def add_vars(self):
         self.add_edge_var()
@@ -45,19 +77,121 @@ class Solver:
 
     def add_edge_var(self):
         # 变量x_kij: 车辆k是否经过边ij，ij是带order维度的虚拟扩展点，以及车辆的起始点
+        # 开启prune时只为预处理后保留的弧建立变量
+        arcs = {veh_k: self.prune_arcs(veh_k, veh_obj) if self.prune else None
+                for veh_k, veh_obj in self.system.vehicle_obj_dict.items()}
         for veh_k, veh_obj in self.system.vehicle_obj_dict.items():
             for node_i in veh_obj.alter_node_list:
                 for node_j in veh_obj.alter_node_list:
-                    if node_i != node_j:
-                        self.x_vars[(veh_k, node_i, node_j)] = LpVariable(name=f'x_{veh_k}_{node_i}_{node_j}',
-                                                                          lowBound=0, upBound=1, cat=LpBinary)
+                    if node_i != node_j and (arcs[veh_k] is None or (node_i, node_j) in arcs[veh_k]):
+                        self.add_x_var((veh_k, node_i, node_j), f'x_{veh_k}_{node_i}_{node_j}')
         for veh_k, veh_obj in self.system.vehicle_obj_dict.items():
             node_origin, node_des = 0, self.system.dummy_node_count + 1
             for node in veh_obj.alter_node_list:
-                    self.x_vars[(veh_k, node_origin, node)] = LpVariable(name=f'{veh_k}_{node_origin}_{node}',
-                                                                         lowBound=0, upBound=1, cat=LpBinary)
-                    self.x_vars[(veh_k, node, node_des)] = LpVariable(name=f'{veh_k}_{node}_{node_des}',
-                                                                      lowBound=0, upBound=1, cat=LpBinary)
+                if arcs[veh_k] is None or (node_origin, node) in arcs[veh_k]:
+                    self.add_x_var((veh_k, node_origin, node), f'{veh_k}_{node_origin}_{node}')
+                if arcs[veh_k] is None or (node, node_des) in arcs[veh_k]:
+                    self.add_x_var((veh_k, node, node_des), f'{veh_k}_{node}_{node_des}')
+        self.compute_arc_data()
+
+    def prune_arcs(self, veh_k, veh_obj):
+        """
+        弧预处理，返回车辆veh_k可能使用的弧(i, j)集合，并输出各规则删除的弧数：
+        (1) 先取后送：删除送货点到自身取货点、起点到送货点、取货点到终点的弧；
+        (2) 时间窗：i的最早开始服务时间 + s_i + t_ij晚于j的最晚开始服务时间的弧，
+            以及取货点p到j时路径p->j->d(p)不可行、i到送货点d(p)时路径p->i->d(p)不可行的弧；
+        (3) 载重：经过弧(i, j)时车上同时有两个订单的货物(取货->取货、取货->其他订单送货、送货->送货)且货物量之和超过max_load，
+            以及货物量本身超过max_load的订单的所有弧
+        """
+        node_des = self.system.dummy_node_count + 1
+        nodes = np.array([0] + veh_obj.alter_node_list + [node_des], dtype=np.int64)
+        info = [self.get_node_info(veh_obj, node) for node in nodes.tolist()]
+        service = np.array([x[1] for x in info], dtype=np.float64)
+        start = np.array([x[2] for x in info], dtype=np.float64)
+        end = np.array([x[3] for x in info], dtype=np.float64)
+        quantity = np.abs(np.array([x[4] for x in info], dtype=np.float64))
+        loca = self.system.node_loca_array(veh_obj)[nodes]
+        travel = self.system.travel_array(veh_obj.speed)[np.ix_(loca, loca)]
+        count = len(nodes)
+        is_pick = (nodes % 2 == 1) & (nodes != node_des)
+        is_del = (nodes % 2 == 0) & (nodes != 0)
+        position = {node: a for a, node in enumerate(nodes.tolist())}
+        pick = np.flatnonzero(is_pick)
+        pair = np.array([position[node + 1] for node in nodes[pick].tolist()], dtype=np.int64)
+
+        # 原模型中的弧：起点到各虚拟点、虚拟点之间、虚拟点到终点
+        keep = np.zeros((count, count), dtype=bool)
+        keep[1:-1, 1:-1] = True
+        np.fill_diagonal(keep, False)
+        keep[0, 1:-1] = True
+        keep[1:-1, -1] = True
+        total = int(keep.sum())
+
+        precedence = np.zeros((count, count), dtype=bool)
+        precedence[pair, pick] = True
+        precedence[0, is_del] = True
+        precedence[is_pick, -1] = True
+
+        window = start[:, None] + service[:, None] + travel > end[None, :]
+        # 路径p->j->d(p)：从p出发经j后到达d(p)的最早时间
+        via = np.maximum(start[None, :], (start[pick] + service[pick])[:, None] + travel[pick, :])
+        late = np.maximum(start[pair][:, None], via + service[None, :] + travel[:, pair].T) > end[pair][:, None]
+        late[np.arange(len(pick)), pair] = False
+        window[pick, :] |= late
+        # 路径p->i->d(p)：i在p之后不可达，或从i出发无法按时到达d(p)
+        late = (via > end[None, :]) | \
+            (np.maximum(start[pair][:, None], via + service[None, :] + travel[:, pair].T) > end[pair][:, None])
+        late[np.arange(len(pick)), pick] = False
+        window[:, pair] |= late.T
+
+        capacity = np.zeros((count, count), dtype=bool)
+        both = (is_pick[:, None] & is_pick[None, :]) | (is_pick[:, None] & is_del[None, :]) | \
+            (is_del[:, None] & is_del[None, :])
+        both[pick, pair] = False
+        capacity |= both & (quantity[:, None] + quantity[None, :] > veh_obj.max_load)
+        heavy = quantity > veh_obj.max_load
+        capacity[heavy, :] = True
+        capacity[:, heavy] = True
+
+        removed = []
+        for mask in (precedence, window, capacity):
+            removed.append(int((keep & mask).sum()))
+            keep &= ~mask
+        print(f'{veh_k}: arcs {total} -> {int(keep.sum())}, removed by precedence {removed[0]}, '
+              f'time window {removed[1]}, capacity {removed[2]}')
+        if not keep.any():
+            print(f'warning: vehicle {veh_k} has no usable arc after pruning, the model is infeasible '
+                  f'because every vehicle must leave its origin')
+        rows, cols = np.nonzero(keep)
+        return set(zip(nodes[rows].tolist(), nodes[cols].tolist()))
+
+    def add_x_var(self, key, name):
+        k, i, j = key
+        self.x_vars[key] = LpVariable(name=name, lowBound=0, upBound=1, cat=LpBinary)
+        self.out_arcs[(k, i)].append(key)
+        self.in_arcs[(k, j)].append(key)
+
+    def out_flow(self, veh_k, node):
+        return lpSum(self.x_vars[key] for key in self.out_arcs[(veh_k, node)])
+
+    def in_flow(self, veh_k, node):
+        return lpSum(self.x_vars[key] for key in self.in_arcs[(veh_k, node)])
+
+    def compute_arc_data(self):
+        # 按车辆把弧两端的虚拟点映射为停靠点编号，从距离矩阵和该车速度对应的耗时矩阵中批量取值
+        # node_loca对所有车辆都建立，预处理后没有弧的车辆也会在add_seq_cons中用到
+        arcs = defaultdict(list)
+        for key in self.x_vars.keys():
+            arcs[key[0]].append(key)
+        for veh_k, veh_obj in self.system.vehicle_obj_dict.items():
+            loca = self.node_loca[veh_k] = self.system.node_loca_array(veh_obj)
+            keys = arcs[veh_k]
+            if not keys:
+                continue
+            nodes = np.array([(key[1], key[2]) for key in keys], dtype=np.int64)
+            loca_i, loca_j = loca[nodes[:, 0]], loca[nodes[:, 1]]
+            self.arc_dist.update(zip(keys, self.system.dist_array[loca_i, loca_j].tolist()))
+            self.travel_time.update(zip(keys, self.system.travel_array(veh_obj.speed)[loca_i, loca_j].tolist()))
 
     def add_node_var(self):
         # 变量q_ki：车辆k到达点i的载货量
@@ -80,81 +214,97 @@ class Solver:
 
     def add_trans_cost_objs(self):
         # 对于变量kij，找到ij的距离和k的单位运输成本，即可计算总运输成本
-        for key in self.x_vars.keys():
-            k, i, j = key[0], key[1], key[2]
-            veh_obj = self.system.vehicle_obj_dict[k]
-            if i == 0:
-                loca_i_name = veh_obj.origin
-            else:
-                loca_i_name = self.system.dummy_node_dict[i][1]
-            if j == len(self.system.dummy_node_dict)+1:
-                loca_j_name = veh_obj.des
-            else:
-                loca_j_name = self.system.dummy_node_dict[j][1]
-            if loca_i_name != loca_j_name:
-                dist = self.system.dist_matrix[(loca_i_name, loca_j_name)]
-                self.objs += self.x_vars[key] * veh_obj.unit_cost * dist
+        terms = []
+        for key, var in self.x_vars.items():
+            dist = self.arc_dist[key]
+            if dist:
+                terms.append((var, self.system.vehicle_obj_dict[key[0]].unit_cost * dist))
+        self.objs = LpAffineExpression(terms)
         self.model += (self.objs, f'minimize_transport_cost')
 
     def add_basic_cons(self):
         # (1) 保证每个货物都被配送：对所有虚拟点中的每个pick点，要求必须存在(pick,j)
         for pick_node in self.system.dummy_node_dict.keys():
-           if pick_node % 2 != 0:
-               lhs_origin = 0
-               for key in self.x_vars.keys():
-                   k, i, j = key[0], key[1], key[2]
-                   if i == pick_node:
-                        lhs_origin += self.x_vars[key]
-               self.model += (lhs_origin == 1, f'{pick_node}_pick_cons')
+            if pick_node % 2 != 0:
+                lhs_origin = lpSum(self.out_flow(veh_k, pick_node) for veh_k in self.system.vehicle_obj_dict.keys())
+                self.model += (lhs_origin == 1, f'{pick_node}_pick_cons')
 
         # (3) 保证取货后要有对应的送货：车辆k经过pick点也一定也要经过对应的del点
         for veh_k, veh_obj in self.system.vehicle_obj_dict.items():
             for node in veh_obj.alter_node_list:
                 if node % 2 != 0:
                     pick_node, del_node = node, node + 1
-                    lhs_origin, rhs = 0, 0
-                    for key in self.x_vars.keys():
-                        k, i, j = key[0], key[1], key[2]
-                        if k == veh_k and i == pick_node:
-                            lhs_origin += self.x_vars[key]
-                        if k == veh_k and i == del_node:
-                            rhs += self.x_vars[key]
+                    lhs_origin, rhs = self.out_flow(veh_k, pick_node), self.out_flow(veh_k, del_node)
                     self.model += (lhs_origin == rhs, f'{veh_k}_{pick_node}_{del_node}_pair_cons')
 
         # (4) 路径平衡约束：每辆车一定经过从起点出发和回到终点，其他虚拟点要保证有进有出
+        node_des = self.system.dummy_node_count + 1
         for veh_k, veh_obj in self.system.vehicle_obj_dict.items():
-            lhs_origin, lhs_des = 0, 0
             for node in veh_obj.alter_node_list:
-                lsh, rhs = 0, 0
-                for key in self.x_vars.keys():
-                    k, i, j = key[0], key[1], key[2]
-                    if k == veh_k and j == node and i == 0:
-                      lhs_origin += self.x_vars[key]
-                    if k == veh_k and i == node and j == (self.system.dummy_node_count + 1):
-                        lhs_des += self.x_vars[key]
-                    if k == veh_k and i == node:
-                        lsh += self.x_vars[key]
-                    if k == veh_k and j == node:
-                        rhs += self.x_vars[key]
+                lsh, rhs = self.out_flow(veh_k, node), self.in_flow(veh_k, node)
                 self.model += (lsh == rhs, f'{veh_k}_{node}_inout_cons')
-            self.model += (lhs_origin == 1, f'{veh_k}_origin_cons')
-            self.model += (lhs_des == 1, f'{veh_k}_des_cons')
-
+            self.model += (self.out_flow(veh_k, 0) == 1, f'{veh_k}_origin_cons')
+            self.model += (self.in_flow(veh_k, node_des) == 1, f'{veh_k}_des_cons')
+
+
+    def get_node_info(self, veh_obj, node):
+        # 虚拟点的(地点名, 服务时间, 最早开始服务时间, 最晚开始服务时间, 载货变动量)，起终点的时间窗为车辆的时间窗
+        if node == 0:
+            return veh_obj.origin, 0, veh_obj.start, veh_obj.end, 0
+        if node == self.system.dummy_node_count + 1:
+            return veh_obj.des, 0, veh_obj.start, veh_obj.end, 0
+        order_id, loca_name, quantity = self.system.dummy_node_dict[node]
+        order_obj = self.system.order_obj_dict[order_id]
+        if node % 2 != 0:
+            return loca_name, order_obj.pick_service, order_obj.pick_start, order_obj.pick_end, quantity
+        return loca_name, order_obj.del_service, order_obj.del_start, order_obj.del_end, quantity
+
+    def compute_big_m(self):
+        """
+        按弧计算最小的big-M：
+        时间约束a_i + w_i + s_i + t_ij - a_j <= M_ij(1 - x_kij)，a_i + w_i不超过i的最晚开始服务时间，
+        a_j不小于min(j的最早开始服务时间, 所有前驱p的最早开始服务时间 + s_p + t_pj)，因此
+        M_ij = max(0, end_i + s_i + t_ij - min(start_j, min_p(start_p + s_p + t_pj)))；
+        载重约束q_i + load_i - q_j <= M_ij(1 - x_kij)，q_j >= 0，车辆经过i时q_i + load_i不超过max_load + min(load_i, 0)，
+        不经过i时q_i可取0，因此M_ij = max(max_load + min(load_i, 0), load_i)
+        big_m为global时使用原来的M：时间2 * end，载重2 * max_load
+        """
+        info = self.node_info
+        travel = self.travel_time
+        earliest = {}
+        for key in self.x_vars.keys():
+            k, i, j = key
+            veh_obj = self.system.vehicle_obj_dict[k]
+            for node in (i, j):
+                if (k, node) not in info:
+                    info[(k, node)] = self.get_node_info(veh_obj, node)
+            _, service_i, start_i, _, _ = info[(k, i)]
+            arrive = start_i + service_i + travel[key]
+            earliest[(k, j)] = min(earliest.get((k, j), arrive), arrive)
+        for key in self.x_vars.keys():
+            k, i, j = key
+            veh_obj = self.system.vehicle_obj_dict[k]
+            _, service_i, _, end_i, load_i = info[(k, i)]
+            if self.big_m == 'global':
+                self.time_big_m[key] = 2 * veh_obj.end
+                self.load_big_m[key] = 2 * veh_obj.max_load
+                continue
+            lower_j = min(info[(k, j)][2], earliest[(k, j)])
+            self.time_big_m[key] = max(0, end_i + service_i + travel[key] - lower_j)
+            self.load_big_m[key] = max(veh_obj.max_load + min(load_i, 0), load_i)
 
     def add_load_cons(self):
         # (5) 负载平衡约束：如果车辆k经过边(i,j)，那么到达i的负载量+节点j的负载量=到达j的负载量
-        for key in self.x_vars.keys():
+        if not self.load_big_m:
+            self.compute_big_m()
+        # 约束q_j >= q_i + load_i + (x_kij - 1) * M整理为q_j - q_i - M * x_kij >= load_i - M后直接按系数建立表达式
+        for key, var in self.x_vars.items():
             k, i, j = key[0], key[1], key[2]
-            veh_obj = self.system.vehicle_obj_dict[k]
-            big_M = 2 * veh_obj.max_load
-            lhs = self.q_vars[(k, j)]
-            if i == 0:
-                rhs = self.q_vars[(k, i)] + (self.x_vars[key] - 1) * big_M
-            else:
-                load_i = self.system.dummy_node_dict[i][2]
-                rhs = self.q_vars[(k, i)] + load_i + (self.x_vars[key] - 1) * big_M
+            big_M = self.load_big_m[key]
+            load_i = self.node_info[(k, i)][4]
+            lhs = LpAffineExpression([(self.q_vars[(k, j)], 1), (self.q_vars[(k, i)], -1), (var, -big_M)])
             # 为了将约束线性化，引入bigM，必须要用不等式，导致该约束限制不了环路的出现
-            self.model += (lhs >= rhs, f'{key}_load_balance_cons')
+            self.model += (lhs >= load_i - big_M, f'{key}_load_balance_cons')
 
         # (6) 负载最大约束：车辆k到达节点i的负载量不能大于最大载量
         for key in self.q_vars.keys():
@@ -167,28 +317,16 @@ class Solver:
     def add_time_cons(self):
         # (7) 时间平衡约束：如果车辆k经过ij，那么到达j的时间=到达i的时间+在i等待的时间+服务i的时间+运输耗时
         # 可以限制环路
-        for key in self.x_vars.keys():
+        if not self.time_big_m:
+            self.compute_big_m()
+        # 约束a_i + w_i + s_i + t_ij + (x_kij - 1) * M <= a_j整理为a_i + w_i - a_j + M * x_kij <= M - s_i - t_ij
+        for key, var in self.x_vars.items():
             k, i, j = key[0], key[1], key[2]
-            veh_obj = self.system.vehicle_obj_dict[k]
-            big_M = 2 * veh_obj.end
-            if j == self.system.dummy_node_count + 1:
-                loca_j_name = veh_obj.des
-            else:
-                loca_j_name = self.system.dummy_node_dict[j][1]
-            if i == 0:
-                loca_i_name = veh_obj.origin
-                service_i = 0
-            else:
-                loca_i_name = self.system.dummy_node_dict[i][1]
-                order_id = self.system.dummy_node_dict[i][0]
-                order_obj = self.system.order_obj_dict[order_id]
-                if i % 2 != 0:
-                    service_i = order_obj.pick_service
-                else:
-                    service_i = order_obj.del_service
-            trans_time = round((self.system.dist_matrix[(loca_i_name, loca_j_name)] / veh_obj.speed) * 3600)
-            lhs = self.a_vars[(k, i)] + self.w_vars[(k, i)] + trans_time + (self.x_vars[key] - 1) * big_M + service_i
-            self.model += (lhs <= self.a_vars[(k, j)], f'{k}_{i}_{j}_time_balance_cons')
+            big_M = self.time_big_m[key]
+            service_i = self.node_info[(k, i)][1]
+            lhs = LpAffineExpression([(self.a_vars[(k, i)], 1), (self.w_vars[(k, i)], 1),
+                                      (self.a_vars[(k, j)], -1), (var, big_M)])
+            self.model += (lhs <= big_M - service_i - self.travel_time[key], f'{k}_{i}_{j}_time_balance_cons')
 
         # (8)(9)(10) 时间窗约束
         # 车辆k在节点i的等待时间=max(0, 节点i可开始服务的时间-到达节点i的时间）
@@ -215,19 +353,13 @@ class Solver:
     def add_limit_cons(self):
         # (11) 最大运输距离限制：车辆k经过的ij总运输距离不能超过车辆最大距离
         for veh_k, veh_obj in self.system.vehicle_obj_dict.items():
-            lhs = 0
-            for key in self.x_vars.keys():
-                k, i, j = key[0], key[1], key[2]
-                if k == veh_k:
-                    if j == self.system.dummy_node_count + 1:
-                        loca_j_name = veh_obj.des
-                    else:
-                        loca_j_name = self.system.dummy_node_dict[j][1]
-                    if i == 0:
-                        loca_i_name = veh_obj.origin
-                    else:
-                        loca_i_name = self.system.dummy_node_dict[i][1]
-                    lhs += self.x_vars[key] * self.system.dist_matrix[(loca_i_name, loca_j_name)]
+            terms = []
+            for node in [0] + veh_obj.alter_node_list:
+                for key in self.out_arcs[(veh_k, node)]:
+                    dist = self.arc_dist[key]
+                    if dist:
+                        terms.append((self.x_vars[key], dist))
+            lhs = LpAffineExpression(terms)
             self.model += (lhs <= veh_obj.max_distance, f'{veh_k}_distance_limit_cons')
 
         # (12) 最大运输时间限制：车辆k到达终点的时间-车辆从起点出发的时间不能超过最大时长
@@ -242,16 +374,34 @@ class Solver:
             veh_obj = self.system.vehicle_obj_dict[k]
             if i % 2 != 0 and i != 0 and i != (self.system.dummy_node_count + 1):
                 node_pick, node_del = i, i + 1
-                order_id, loca_i_name, _ = self.system.dummy_node_dict[node_pick]
-                loca_j_name = self.system.dummy_node_dict[node_del][1]
-                order_obj = self.system.order_obj_dict[order_id]
-                trans_time = round((self.system.dist_matrix[(loca_i_name, loca_j_name)] / veh_obj.speed) * 3600)
+                order_obj = self.system.order_obj_dict[self.system.dummy_node_dict[node_pick][0]]
+                loca = self.node_loca[k]
+                trans_time = int(self.system.travel_array(veh_obj.speed)[loca[node_pick], loca[node_del]])
                 lhs = self.a_vars[(k, node_pick)] + self.w_vars[(k, node_pick)] + order_obj.pick_service + trans_time
                 self.model += (lhs <= self.a_vars[(k, node_del)], f'{k}_{i}_{i+1}_seq_cons')
 
+    def relax_bound(self):
+        # x_kij临时改为连续变量求LP松弛，得到各后端通用的根节点下界(不含求解器在根节点加的割平面)
+        for var in self.x_vars.values():
+            var.cat = LpContinuous
+        try:
+            self.model.solve(create_backend(self.backend, msg=False))
+            return value(self.model.objective) if LpStatus[self.model.status] == 'Optimal' else None
+        finally:
+            for var in self.x_vars.values():
+                var.cat = LpInteger
+
     def solve_model(self):
-        self.model.writeLP('./Result/PickDeliveryPTW.lp')
-        self.model.solve(GUROBI_CMD(msg=True, timeLimit=600, options=[(SolveConfig.Heuristic, 400)]))
+        if self.export_lp:
+            self.model.writeLP(self.export_lp)
+        self.root_bound = self.relax_bound()
+        start = perf_counter()
+        self.model.solve(create_backend(self.backend))
+        self.solve_time = perf_counter() - start
+        found = self.model.sol_status in (LpSolutionOptimal, LpSolutionIntegerFeasible)
+        print(f'{self.big_m} M: solve time {self.solve_time:.2f}s, status {LpStatus[self.model.status]}, '
+              f'solution {LpSolution[self.model.sol_status]}, '
+              f'objective {value(self.model.objective) if found else None}, root bound {self.root_bound}')
         if LpStatus[self.model.status] == 'Infeasible':
             for cons in self.model.constraints.values():
                 print(f'{cons.name}: {cons.value()}')
@@ -315,11 +465,16 @@ class Result:
         plan_data.to_csv('./Result/PlanSolution.csv', index=False)
 
 
-
-path = './Data/PDPTWData.xls'
-system = System(path)
-solver = Solver(system)
-result = Result(system, solver)
-solver.run()
-result.build_graph()
-result.export_plan()
\ No newline at end of file
+if __name__ == '__main__':
+    # 参数：求解后端名称(默认auto)，加lp时导出./Result/PickDeliveryPTW.lp用于调试，加noprune时不做弧预处理，
+    # 加global时使用全局big-M(对比按弧的big-M)
+    args = [a for a in sys.argv[1:] if a not in ('lp', 'noprune', 'global')]
+    path = './Data/PDPTWData.xls'
+    system = System(path)
+    solver = Solver(system, backend=args[0] if args else SolveConfig.Backend,
+                    export_lp='./Result/PickDeliveryPTW.lp' if 'lp' in sys.argv[1:] else None,
+                    prune='noprune' not in sys.argv[1:], big_m='global' if 'global' in sys.argv[1:] else 'arc')
+    result = Result(system, solver)
+    solver.run()
+    result.build_graph()
+    result.export_plan()
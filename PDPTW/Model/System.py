@@ -2,10 +2,21 @@ from dataclasses import dataclass
 from typing import Optional, Dict
 from datetime import datetime
 from collections import defaultdict
+import os
+import sys
+import pickle
+import hashlib
+import numpy as np
 import pandas as pd
-import math
 
 from InFileField import *
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from Common.Distance import distance_matrix, CACHE_DIR
+
+# 快照格式变化时修改版本号，使旧快照失效
+SNAPSHOT_VERSION = 2
+# 快照很小，默认写入用户缓存目录；设置ROUTING_CACHE_DIR时与距离矩阵缓存放在一起
+SNAPSHOT_DIR = CACHE_DIR or os.path.join(os.path.expanduser('~'), '.cache', 'routing')
 
 
 @dataclass
@@ -59,8 +70,14 @@ class Order:
         self.del_end = del_end
 
 class System:
-    def __init__(self, path):
+    # 写入快照的解析结果
+    SNAPSHOT_FIELDS = ['location_obj_dict', 'vehicle_obj_dict', 'order_obj_dict', 'loca_index', 'dist_array',
+                       'dummy_node_dict', 'dummy_node_count', 'dummy_loca', 'base_datetime']
+
+    def __init__(self, path, cache_dir=SNAPSHOT_DIR):
         self.path = path
+        # 解析结果的快照目录，为None时每次都重新读取Excel
+        self.cache_dir = cache_dir
         self.location_obj_dict: Dict[str, Location] = {}
         self.vehicle_obj_dict: Dict[str, Vehicle] = {}
         self.order_obj_dict: Dict[str, Order] = {}
@@ -68,10 +85,16 @@ class System:
         """
         基础信息
         """
-        self.dist_matrix: Dict[tuple, float] = defaultdict(float)
+        # 停靠点名称 -> 整数编号，dist_array[a, b]为编号a、b之间的距离(千米)
+        self.loca_index: Dict[str, int] = {}
+        self.dist_array: np.ndarray = np.empty((0, 0))
+        # 速度 -> 运输耗时(秒)矩阵，按需计算
+        self.travel_array_dict: Dict[float, np.ndarray] = {}
         # loca是实际点，node是虚拟点
         self.dummy_node_dict: Dict[int, tuple] = {}
         self.dummy_node_count: int = 0
+        # 虚拟点 -> 停靠点编号，下标0和dummy_node_count+1由车辆的起终点决定，见node_loca_array
+        self.dummy_loca: np.ndarray = np.empty(0, dtype=np.int64)
         self.base_datetime: Optional[datetime] = None
         """
         system初始化
@@ -79,52 +102,59 @@ class System:
         self.create_environment()
 
     def create_environment(self):
-        self.create_location()
-        self.create_vehicle()
-        self.create_order()
+        if self.load_snapshot():
+            return
+        location_data, vehicle_data, order_data = self.read_workbook()
+        self.create_location(location_data)
+        self.create_vehicle(vehicle_data)
+        self.create_order(order_data)
         self.get_dist_matrix()
         self.vehicle_map_order()
+        self.save_snapshot()
+
+    def read_workbook(self):
+        # 一次读取全部sheet，依次为停靠点、车辆、货物
+        sheets = pd.read_excel(self.path, sheet_name=None)
+        return tuple(sheets.values())[:3]
+
+    def create_location(self, location_data):
+        for loca_name, longitude, latitude in zip(location_data[InLocaFD.ID].tolist(),
+                                                  location_data[InLocaFD.Longitude].tolist(),
+                                                  location_data[InLocaFD.Latitude].tolist()):
+            self.location_obj_dict[loca_name] = Location(ID=loca_name, longitude=longitude, latitude=latitude)
 
-    def create_location(self):
-        location_data = pd.read_excel(self.path, sheet_name=0)
-        for row in location_data.itertuples():
-            loca_name = getattr(row, InLocaFD.ID)
-            location_obj = Location(ID=loca_name,
-                                    longitude=getattr(row, InLocaFD.Longitude),
-                                    latitude=getattr(row, InLocaFD.Latitude))
-            self.location_obj_dict[loca_name] = location_obj
-
-    def create_vehicle(self):
-        vehicle_data = pd.read_excel(self.path, sheet_name=1)
-        vehicle_data[InVehFD.EarliestStart] = pd.to_datetime(vehicle_data[InVehFD.EarliestStart])
-        vehicle_data[InVehFD.LatestEnd] = pd.to_datetime(vehicle_data[InVehFD.LatestEnd])
-        self.base_datetime = vehicle_data[InVehFD.EarliestStart].min()
-        for index, row in vehicle_data.iterrows():
-            veh_id = row[InVehFD.ID]
-            match_rela = row[InVehFD.Match].split(',')
-            start = self.time_diff_util(row[InVehFD.EarliestStart])
-            end = self.time_diff_util(row[InVehFD.LatestEnd])
-            vehicle_obj = Vehicle(id=veh_id, origin=row[InVehFD.Origin], des=row[InVehFD.Des], start=start, end=end,
-                                  max_distance=row[InVehFD.MaxDist], max_time=row[InVehFD.MaxTime],
-                                  match=match_rela, speed=row[InVehFD.Speed],
-                                  max_load=row[InVehFD.Load], unit_cost=row[InVehFD.UnitCost])
+    def create_vehicle(self, vehicle_data):
+        earliest_start = pd.to_datetime(vehicle_data[InVehFD.EarliestStart])
+        latest_end = pd.to_datetime(vehicle_data[InVehFD.LatestEnd])
+        self.base_datetime = earliest_start.min()
+        columns = zip(vehicle_data[InVehFD.ID].tolist(), vehicle_data[InVehFD.Origin].tolist(),
+                      vehicle_data[InVehFD.Des].tolist(), self.time_diff_column(earliest_start),
+                      self.time_diff_column(latest_end), vehicle_data[InVehFD.MaxDist].tolist(),
+                      vehicle_data[InVehFD.MaxTime].tolist(), vehicle_data[InVehFD.Match].str.split(',').tolist(),
+                      vehicle_data[InVehFD.Speed].tolist(), vehicle_data[InVehFD.Load].tolist(),
+                      vehicle_data[InVehFD.UnitCost].tolist())
+        for veh_id, origin, des, start, end, max_distance, max_time, match_rela, speed, max_load, unit_cost in columns:
+            vehicle_obj = Vehicle(id=veh_id, origin=origin, des=des, start=start, end=end,
+                                  max_distance=max_distance, max_time=max_time,
+                                  match=match_rela, speed=speed,
+                                  max_load=max_load, unit_cost=unit_cost)
             self.vehicle_obj_dict[veh_id] = vehicle_obj
 
-    def create_order(self):
-        order_data = pd.read_excel(self.path, sheet_name=2)
-        for index, row in order_data.iterrows():
-            order_id = row[InOrderFD.ID]
-            match_rela = row[InVehFD.Match].split(',')
-            pick_loca, del_loca = row[InOrderFD.PickLoca], row[InOrderFD.DelLoca]
-            pick_start = self.time_diff_util(row[InOrderFD.PickStart])
-            pick_end = self.time_diff_util(row[InOrderFD.PickEnd])
-
-            del_start = self.time_diff_util(row[InOrderFD.DelStart])
-            del_end = self.time_diff_util(row[InOrderFD.DelEnd])
-            order_obj = Order(id=order_id, match=match_rela, quantity=row[InOrderFD.Quantity],
-                              pick_loca=pick_loca, pick_service=row[InOrderFD.PickService] * 60,
+    def create_order(self, order_data):
+        columns = zip(order_data[InOrderFD.ID].tolist(), order_data[InOrderFD.Match].str.split(',').tolist(),
+                      order_data[InOrderFD.Quantity].tolist(),
+                      order_data[InOrderFD.PickLoca].tolist(), (order_data[InOrderFD.PickService] * 60).tolist(),
+                      self.time_diff_column(order_data[InOrderFD.PickStart]),
+                      self.time_diff_column(order_data[InOrderFD.PickEnd]),
+                      order_data[InOrderFD.DelLoca].tolist(), (order_data[InOrderFD.DelService] * 60).tolist(),
+                      self.time_diff_column(order_data[InOrderFD.DelStart]),
+                      self.time_diff_column(order_data[InOrderFD.DelEnd]))
+        for (order_id, match_rela, quantity, pick_loca, pick_service, pick_start, pick_end,
+             del_loca, del_service, del_start, del_end) in columns:
+            order_obj = Order(id=order_id, match=match_rela, quantity=quantity,
+                              pick_loca=pick_loca, pick_service=pick_service,
                               pick_start=pick_start, pick_end=pick_end,
-                              del_loca=del_loca, del_service=row[InOrderFD.DelService] * 60,
+                              del_loca=del_loca, del_service=del_service,
                               del_start=del_start, del_end=del_end)
             self.order_obj_dict[order_id] = order_obj
 
@@ -137,21 +167,29 @@ class System:
         self.dummy_node_count = len(self.dummy_node_dict)
 
     def get_dist_matrix(self):
-        def calc_dist(lng1, lat1, lng2, lat2):
-            lat1, lon1, lat2, lon2 = map(math.radians, [lat1, lng1, lat2, lng2])
-            d_lat = lat2 - lat1
-            d_lon = lon2 - lon1
-            a = math.sin(d_lat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(d_lon / 2) ** 2
-            c = 2 * math.asin(math.sqrt(a))
-            r = 6371
-            return c * r
-
-        for loca_id_from, loca_obj_from in self.location_obj_dict.items():
-            for loca_id_to, loca_obj_to in self.location_obj_dict.items():
-                if loca_id_from != loca_id_to:
-                    dist = calc_dist(loca_obj_from.longitude, loca_obj_from.latitude,
-                                     loca_obj_to.longitude, loca_obj_to.latitude)
-                    self.dist_matrix[(loca_id_from, loca_id_to)] = dist
+        # 球面距离由Common.Distance向量化计算并缓存，停靠点按读入顺序编号
+        self.loca_index = {loca_id: i for i, loca_id in enumerate(self.location_obj_dict.keys())}
+        lng_lat = [(loca_obj.longitude, loca_obj.latitude) for loca_obj in self.location_obj_dict.values()]
+        self.dist_array = np.array(distance_matrix(lng_lat, metric='haversine'), dtype=np.float64)
+        np.fill_diagonal(self.dist_array, 0)
+        self.dummy_loca = np.array([0] + [self.loca_index[self.dummy_node_dict[node][1]]
+                                          for node in range(1, self.dummy_node_count + 1)] + [0], dtype=np.int64)
+
+    def node_loca_array(self, veh_obj: Vehicle):
+        # 车辆veh_obj视角下虚拟点0..dummy_node_count+1对应的停靠点编号
+        loca = self.dummy_loca.copy()
+        loca[0] = self.loca_index[veh_obj.origin]
+        loca[-1] = self.loca_index[veh_obj.des]
+        return loca
+
+    def travel_array(self, speed: float):
+        # 运输耗时(秒)取整，同一速度的车辆共用一个矩阵
+        if speed not in self.travel_array_dict:
+            self.travel_array_dict[speed] = np.round(self.dist_array / speed * 3600).astype(np.int64)
+        return self.travel_array_dict[speed]
+
+    def get_dist(self, loca_i: str, loca_j: str):
+        return float(self.dist_array[self.loca_index[loca_i], self.loca_index[loca_j]])
 
     def vehicle_map_order(self):
         match_map_order = defaultdict(list)
@@ -171,6 +209,69 @@ class System:
         else:
             return (time - self.base_datetime).seconds
 
+    def time_diff_column(self, column):
+        # time_diff_util的按列版本
+        column = pd.to_datetime(column)
+        seconds = (column - self.base_datetime).dt.seconds
+        return seconds.where(column > self.base_datetime, 0).astype(int).tolist()
+
+    '''
+    解析结果快照：以文件绝对路径定位快照，mtime和大小未变时直接使用，
+    否则比较文件内容的sha1，内容未变(如只是被touch)时仍可使用
+    '''
+
+    def snapshot_path(self):
+        key = hashlib.sha1(os.path.abspath(self.path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'system_{key}.pkl')
+
+    def file_meta(self, digest=None):
+        stat = os.stat(self.path)
+        return {'version': SNAPSHOT_VERSION, 'path': os.path.abspath(self.path),
+                'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha1': digest}
+
+    def file_digest(self):
+        digest = hashlib.sha1()
+        with open(self.path, 'rb') as file:
+            for block in iter(lambda: file.read(1 << 20), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def load_snapshot(self):
+        if self.cache_dir is None or not os.path.exists(self.snapshot_path()):
+            return False
+        # 快照损坏、被截断，或类/模块路径改动后未更新SNAPSHOT_VERSION时无法反序列化，重新读取Excel并覆盖快照
+        try:
+            with open(self.snapshot_path(), 'rb') as file:
+                # 元数据和解析结果分两次pickle，失效时不需要反序列化整个快照
+                meta = pickle.load(file)
+                current = self.file_meta(meta.get('sha1'))
+                if meta != current:
+                    current['sha1'] = self.file_digest()
+                    if meta.get('version') != SNAPSHOT_VERSION or meta.get('sha1') != current['sha1']:
+                        return False
+                state = pickle.load(file)
+                values = {field: state[field] for field in self.SNAPSHOT_FIELDS}
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError, KeyError, TypeError) as error:
+            print(f'ignore unreadable snapshot {self.snapshot_path()}: {type(error).__name__}: {error}')
+            return False
+        for field, value in values.items():
+            setattr(self, field, value)
+        if meta != current:
+            self.save_snapshot(current['sha1'])
+        return True
+
+    def save_snapshot(self, digest=None):
+        if self.cache_dir is None:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.snapshot_path()
+        temp = f'{path}.{os.getpid()}.tmp'
+        with open(temp, 'wb') as file:
+            pickle.dump(self.file_meta(digest or self.file_digest()), file, pickle.HIGHEST_PROTOCOL)
+            pickle.dump({field: getattr(self, field) for field in self.SNAPSHOT_FIELDS}, file,
+                        pickle.HIGHEST_PROTOCOL)
+        os.replace(temp, path)
+
     def print_system_info(self):
         for veh_id, veh_obj in self.vehicle_obj_dict.items():
             print(veh_obj.alter_order_list)
@@ -178,4 +279,5 @@ class System:
         print(self.dummy_node_dict)
         for order_id, order_obj in self.order_obj_dict.items():
             print(order_obj.pick_start, order_obj.pick_end, order_obj.del_start, order_obj.del_end)
-        print(self.dist_matrix)
\ No newline at end of file
+        print(self.loca_index)
+        print(self.dist_array)
\ No newline at end of file
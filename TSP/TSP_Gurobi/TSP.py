@@ -3,12 +3,22 @@ Gurobi for TSP
 author：carrot
 time：2024/1/30
 """
+import os
+import sys
+import numpy as np
 import gurobipy as gp
-from collections import namedtuple
-import math
+from collections import namedtuple, defaultdict
 from itertools import combinations
 from gurobipy import GRB
 import matplotlib.pyplot as plt
+import networkx as nx
+from scipy.spatial import cKDTree, Delaunay, QhullError
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../TSP_LS'))
+from Common.Distance import distance_matrix, euclidean_rows
+from Common.WarmStart import set_start, record_incumbent, report
+from ILS_TSP import iterated_local_search
+from Construct import construct
 
 '''
 (1)数据处理
@@ -29,81 +39,320 @@ def read(path):
     return node_count, points_list
 
 
-def distance(point1, point2):
-    diff_x = point1.x - point2.x
-    diff_y = point1.y - point2.y
-    diff = math.sqrt(diff_x ** 2 + diff_y ** 2)
-    return diff
+# 城市编号到points中行号的映射，距离矩阵按行号索引，文件中的编号不必是1..n
+def row_index(points):
+    return {p.index: r for r, p in enumerate(points)}
+
+
+def edge_dist(matrix, row, edges):
+    return {(i, j): float(matrix[row[i], row[j]]) for i, j in edges}
+
+
+# 无向边的键统一为(较小编号, 较大编号)，编号不随行号递增时也不会出现(a,b)和(b,a)两个变量
+def edge_key(i, j):
+    return (i, j) if i < j else (j, i)
+
+
+# 按行号给出的路径转换为回路上的边
+def tour_edges(points, path):
+    return [edge_key(points[a].index, points[b].index) for a, b in zip(path, path[1:] + path[:1])]
+
+
+# 稀疏模式的候选边：k近邻 + Delaunay三角剖分的边，键为edge_key
+def candidate_edges(points, k=10):
+    coords = np.array([[p.x, p.y] for p in points])
+    _, nbr = cKDTree(coords).query(coords, k=min(k, len(points) - 1) + 1)
+    pairs = [np.column_stack([np.repeat(np.arange(len(points)), nbr.shape[1] - 1), nbr[:, 1:].ravel()])]
+    try:
+        simplices = Delaunay(coords).simplices
+        pairs.extend([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+    except QhullError:
+        # 共线等退化情况只用k近邻边
+        pass
+    pairs = np.unique(np.sort(np.vstack(pairs), axis=1), axis=0)
+    return [edge_key(points[i].index, points[j].index) for i, j in pairs if i != j]
+
+
+# warm start：用TSP_LS中的增量ILS求一条路径，返回路径上的边
+def heuristic_tour(points, max_search=200):
+    path, _ = iterated_local_search(len(points), points, max_search, 'or_opt', incremental=True, init='greedy')
+    return tour_edges(points, path)
 
 
-number, points = read('Berlin52.txt')
-dist = {(p1.index, p2.index): distance(p1, p2) for p1, p2 in combinations(points, 2)}
-print(dist)
 '''
 (2)构建模型
 '''
-m = gp.Model()
-# 决策变量
-decision_var = m.addVars(dist.keys(), obj=dist, vtype=GRB.BINARY, name='x')
-# 对称约束
-for i, j in decision_var.keys():
-    decision_var[j, i] = decision_var[i, j]
-# 进出约束
-m.addConstrs(decision_var.sum(p.index, '*') == 2 for p in points)
 
 
-# 子圈消除约束：callback + lazy constraints
+def build_model(points, dist, tour=None, max_cut_rounds=50):
+    m = gp.Model()
+    # 决策变量
+    decision_var = m.addVars(dist.keys(), obj=dist, vtype=GRB.BINARY, name='x')
+    # 给定启发式路径时作为MIP start
+    if tour is not None:
+        set_start(decision_var, {e: 1 for e in tour})
+    # 对称约束
+    for i, j in list(decision_var.keys()):
+        decision_var[j, i] = decision_var[i, j]
+    # 进出约束
+    degree = m.addConstrs((decision_var.sum(p.index, '*') == 2 for p in points), name='degree')
+    m._vars = decision_var
+    m._edges = []
+    # 每个点关联的边，子圈约束只需遍历集合内点的关联边
+    m._adj = defaultdict(list)
+    for e in dist.keys():
+        add_edge_index(m, e)
+    m._nodes = [p.index for p in points]
+    m._row = row_index(points)
+    m._degree = degree
+    # 回调中加入过的子圈集合，稀疏模式下会作为显式约束保留
+    m._cuts = []
+    m._incumbents = []
+    # 分数解分离只在根节点进行，且最多max_cut_rounds轮，避免每个节点都做最小割
+    m._cut_rounds = 0
+    m._max_cut_rounds = max_cut_rounds
+    m.Params.lazyConstraints = 1
+    # 用户割需要关闭对原问题变量的预处理化简
+    m.Params.preCrush = 1
+    return m
+
+
+def add_edge_index(model, e):
+    model._edges.append(e)
+    model._adj[e[0]].append(e)
+    model._adj[e[1]].append(e)
+
+
+# 子圈消除约束：callback + lazy constraints(整数解) + user cuts(分数解)
 def sub_tour_eliminate(model, where):
-    # 如果当前优化状态为找到新的MIP解
+    # 如果当前优化状态为找到新的MIP解，对找到的每个子圈都加入lazy constraint
     if where == GRB.Callback.MIPSOL:
-        # 获取当前解
         values = model.cbGetSolution(model._vars)
-        selected = gp.tuplelist((i, j) for i, j in model._vars.keys() if values[i, j] > 0.5)
-        # 找到最小的圈
-        cycle = get_sub_tour(selected)
-        # 如果最小的圈长度不等于节点数，表明是子圈，将该圈的子圈消除约束添加到模型中
-        if len(cycle) < number:
-            model.cbLazy(gp.quicksum(model._vars[i, j] for i, j in combinations(cycle, 2)) <= len(cycle) - 1)
-
-
-# 找到最小的子圈，用于添加lazy constraints
-def get_sub_tour(edges):
-    unvisited = [p.index for p in points]
-    cycle = edges[:]
-    while unvisited:
-        current_cycle = []
-        neighbors = unvisited
-        while neighbors:
-            current = neighbors[0]
-            current_cycle.append(current)
-            unvisited.remove(current)
-            neighbors = [j for i, j in edges.select(current, '*') if j in unvisited]
-        if len(current_cycle) < len(cycle):
-            cycle = current_cycle
-    return cycle
+        selected = [(i, j) for i, j in model._edges if values[i, j] > 0.5]
+        tours = get_sub_tours(selected, model._nodes)
+        if len(tours) == 1:
+            record_incumbent(model, model.cbGet(GRB.Callback.MIPSOL_OBJ))
+        else:
+            # 两个子圈时它们互为补集，只需加一次
+            added = set()
+            for tour in tours:
+                side = frozenset(smaller_side(tour, model._nodes))
+                if side not in added:
+                    added.add(side)
+                    model._cuts.append(side)
+                    model.cbLazy(sub_tour_expr(model, side) <= len(side) - 1)
+    # 如果当前节点的LP松弛已求解，对分数解做最小割分离
+    elif where == GRB.Callback.MIPNODE and model.cbGet(GRB.Callback.MIPNODE_STATUS) == GRB.OPTIMAL \
+            and model.cbGet(GRB.Callback.MIPNODE_NODCNT) == 0 and model._cut_rounds < model._max_cut_rounds:
+        model._cut_rounds += 1
+        values = model.cbGetNodeRel(model._vars)
+        support = [(i, j, values[i, j]) for i, j in model._edges if values[i, j] > 1e-6]
+        for cut_set in separate_fractional(support, model._nodes):
+            side = frozenset(smaller_side(cut_set, model._nodes))
+            model._cuts.append(side)
+            model.cbCut(sub_tour_expr(model, side) <= len(side) - 1)
+
+
+def find(parent, i):
+    while parent[i] != i:
+        parent[i] = parent[parent[i]]
+        i = parent[i]
+    return i
+
+
+# 并查集求解所有子圈(连通分量)，每条边只处理一次
+def get_sub_tours(edges, nodes):
+    parent = {i: i for i in nodes}
+    for i, j in edges:
+        ri, rj = find(parent, i), find(parent, j)
+        if ri != rj:
+            parent[ri] = rj
+    groups = defaultdict(list)
+    for i in nodes:
+        groups[find(parent, i)].append(i)
+    return list(groups.values())
+
+
+# 找到最小的子圈
+def get_sub_tour(edges, nodes):
+    return min(get_sub_tours(edges, nodes), key=len)
+
+
+# S和其补集的子圈消除约束等价，取点数较少的一侧以减少约束中的变量
+def smaller_side(cycle, nodes):
+    if 2 * len(cycle) <= len(nodes):
+        return cycle
+    inside = set(cycle)
+    return [i for i in nodes if i not in inside]
+
+
+def sub_tour_expr(model, side):
+    # 每条边只在其第一个端点处计入一次
+    return gp.quicksum(model._vars[e] for i in side for e in model._adj[i] if e[0] == i and e[1] in side)
+
+
+# 分数解分离：支撑图不连通时每个分量都是违反的子圈；连通时用Stoer-Wagner求全局最小割，割值<2即违反
+def separate_fractional(support, nodes, eps=1e-4):
+    # 先用并查集求连通分量，不连通时不需要建图做最小割
+    components = get_sub_tours([(i, j) for i, j, _ in support], nodes)
+    if len(components) > 1:
+        return components
+    graph = nx.Graph()
+    graph.add_nodes_from(nodes)
+    graph.add_weighted_edges_from(support)
+    cut_value, (side, _) = nx.stoer_wagner(graph)
+    if cut_value < 2 - eps:
+        return [list(side)]
+    return []
 
 
 '''
-(4)求解模型
-'''
-m._vars = decision_var
-m.Params.lazyConstraints = 1
-m.optimize(sub_tour_eliminate)
-'''
-(5)结果展示
+(3)稀疏模式：候选边 + 定价
 '''
-vals = m.getAttr('x', decision_var)
-select_opt = gp.tuplelist((i, j) for i, j in vals.keys() if vals[i, j] > 0.5)
-tour = get_sub_tour(select_opt)
-assert len(tour) == number
+
+
+def add_edges(model, edges, dist):
+    # 新边同时加入两个端点的进出约束和包含两个端点的子圈约束
+    for i, j in edges:
+        i, j = edge_key(i, j)
+        constrs = [model._degree[i], model._degree[j]]
+        constrs.extend(constr for side, constr in model._sec if i in side and j in side)
+        var = model.addVar(obj=dist[i, j], vtype=GRB.BINARY, name=f'x[{i},{j}]',
+                           column=gp.Column([1.0] * len(constrs), constrs))
+        model._vars[i, j] = model._vars[j, i] = var
+        add_edge_index(model, (i, j))
+    model.update()
+
+
+def keep_cuts(model):
+    # 回调中的lazy constraint和user cut在模型修改后不会保留，转成显式约束
+    known = {side for side, _ in model._sec}
+    for side in model._cuts:
+        if side not in known:
+            known.add(side)
+            constr = model.addConstr(sub_tour_expr(model, side) <= len(side) - 1, name=f'sec[{len(model._sec)}]')
+            model._sec.append((side, constr))
+    model._cuts = []
+    model.update()
+
+
+def price_edges(model, coords, threshold, chunk=1024):
+    """
+    求解当前模型(含已有子圈约束)的LP松弛，按对偶值计算所有未加入边的检验数
+    rc_ij = c_ij - pi_i - pi_j - sum(sigma_S: i,j∈S)，返回rc < threshold的边和LP目标值
+    """
+    lp = model.relax()
+    lp.Params.OutputFlag = 0
+    lp.optimize()
+    n = len(coords)
+    index = model._row
+    pi = np.array([lp.getConstrByName(model._degree[node].ConstrName).Pi for node in model._nodes])
+    sec = [(side, lp.getConstrByName(constr.ConstrName).Pi) for side, constr in model._sec]
+    sec = [(side, sigma) for side, sigma in sec if abs(sigma) > 1e-9]
+    member = np.zeros((n, len(sec)))
+    for c, (side, _) in enumerate(sec):
+        member[[index[node] for node in side], c] = 1
+    sigma = np.array([s for _, s in sec])
+    existing = np.array([(index[i], index[j]) for i, j in model._edges])
+    existing = np.sort(existing, axis=1)
+    found = []
+    for start in range(0, n, chunk):
+        end = min(start + chunk, n)
+        rc = euclidean_rows(coords, start, end) - pi[start:end, None] - pi[None, :]
+        if len(sec):
+            rc -= (member[start:end] * sigma) @ member.T
+        # 只看上三角中未加入的边
+        rc[np.tril(np.ones((end - start, n), dtype=bool), k=start)] = np.inf
+        rows = existing[(existing[:, 0] >= start) & (existing[:, 0] < end)]
+        rc[rows[:, 0] - start, rows[:, 1]] = np.inf
+        for r, c in zip(*np.nonzero(rc < threshold)):
+            found.append(edge_key(model._nodes[start + r], model._nodes[c]))
+    return found, lp.ObjVal, lp
+
+
+def solve_sparse(points, k=10, warm_start=False):
+    """
+    稀疏候选边模型：先只用k近邻+Delaunay边求解，再对未加入的边按LP对偶定价
+    (1) LP检验数为负的边加入后重新求LP，直到对偶可行，此时LP值是完整问题的下界；
+    (2) 只有rc < 当前最优整数解 - LP下界的边才可能改进整数解，加入这些边后重新求解，没有这样的边时即为全局最优
+    """
+    coords = np.array([[p.x, p.y] for p in points])
+    full = distance_matrix(coords)
+    edges = candidate_edges(points, k)
+    tour = heuristic_tour(points) if warm_start else None
+    # 候选边图不一定含哈密顿回路，并入一条回路的边保证受限模型可行；启发式路径的边也不一定都在候选边中
+    edges = sorted(set(edges) | set(tour if tour is not None else tour_edges(points, construct(points, 'greedy'))))
+    row = row_index(points)
+    dist = edge_dist(full, row, edges)
+    model = build_model(points, dist, tour)
+    model._sec = []
+    # 多次optimize的累计用时，report和整数解记录都按累计时间计算
+    model._runtime_offset = 0.0
+    while True:
+        model._cut_rounds = 0
+        model.optimize(sub_tour_eliminate)
+        runtime = model.Runtime
+        if model.SolCount == 0:
+            raise RuntimeError(f'restricted model has no feasible tour, status {model.Status}')
+        upper = model.ObjVal
+        keep_cuts(model)
+        # 用分数解分离强化LP，并把检验数为负的边加入，直到LP对偶可行
+        while True:
+            negative, lower, lp = price_edges(model, coords, -1e-9)
+            values = {(i, j): lp.getVarByName(model._vars[i, j].VarName).X for i, j in model._edges}
+            support = [(i, j, v) for (i, j), v in values.items() if v > 1e-6]
+            cuts = separate_fractional(support, model._nodes)
+            model._cuts = [frozenset(smaller_side(cut, model._nodes)) for cut in cuts]
+            keep_cuts(model)
+            if negative:
+                dist.update(edge_dist(full, row, negative))
+                add_edges(model, negative, dist)
+            if not negative and not cuts:
+                break
+        improving, lower, _ = price_edges(model, coords, upper - lower - 1e-6)
+        print(f'edges:{len(model._edges)}, upper:{upper}, lower:{lower}, priced in:{len(improving)}')
+        if not improving:
+            return model
+        dist.update(edge_dist(full, row, improving))
+        add_edges(model, improving, dist)
+        model._runtime_offset += runtime
+
+
+def solve_dense(points, warm_start=False):
+    matrix = distance_matrix([(p.x, p.y) for p in points])
+    dist = edge_dist(matrix, row_index(points), (edge_key(p1.index, p2.index) for p1, p2 in combinations(points, 2)))
+    model = build_model(points, dist, heuristic_tour(points) if warm_start else None)
+    model.optimize(sub_tour_eliminate)
+    return model
 
 
 def plot(ans, city):
+    city = {p.index: p for p in city}
     for node1, node2 in ans:
-        plt.plot([city[node1-1].x, city[node2-1].x], [city[node1-1].y, city[node2-1].y], c='r')
-        plt.scatter(city[node1-1].x, city[node1-1].y, c='black')
+        plt.plot([city[node1].x, city[node2].x], [city[node1].y, city[node2].y], c='r')
+        plt.scatter(city[node1].x, city[node1].y, c='black')
     plt.show()
 
 
-plot(select_opt, points)
-
+if __name__ == '__main__':
+    '''
+    (4)求解模型
+    '''
+    number, points = read('Berlin52.txt')
+    sparse = 'sparse' in sys.argv[1:]
+    solve = solve_sparse if sparse else solve_dense
+    # 加参数warm时对比有无ILS warm start的求解时间
+    if 'warm' in sys.argv[1:]:
+        report(solve(points), 'cold start')
+        m = solve(points, warm_start=True)
+        report(m, 'warm start')
+    else:
+        m = solve(points)
+    '''
+    (5)结果展示
+    '''
+    vals = m.getAttr('x', m._vars)
+    select_opt = gp.tuplelist((i, j) for i, j in m._edges if vals[i, j] > 0.5)
+    tour = get_sub_tour(select_opt, m._nodes)
+    assert len(tour) == number
+    plot(select_opt, points)
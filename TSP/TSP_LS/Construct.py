@@ -0,0 +1,197 @@
+"""
+Construction heuristics for TSP
+author：carrot
+time：10/1/2023
+"""
+import math
+import numpy as np
+from scipy.spatial import cKDTree, Delaunay, QhullError
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import minimum_spanning_tree, depth_first_order
+
+
+def get_coords(points):
+    return np.array([[p.x, p.y] for p in points], dtype=float)
+
+
+def greedy_edge(points, k=10):
+    """
+    贪心边匹配：按长度从短到长加入k近邻候选边，保证度数<=2且不成环
+    剩余的路径片段只在端点之间重复做近邻匹配，直到连成一条路径
+    """
+    coords = get_coords(points)
+    n = len(coords)
+    if n <= 3:
+        return list(range(n))
+    parent = list(range(n))
+    degree = [0] * n
+    adj = [[] for _ in range(n)]
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def add_edges(index, kk):
+        # index为参与匹配的城市，在它们之间取kk近邻候选边并贪心加入
+        dist, nbr = cKDTree(coords[index]).query(coords[index], k=kk + 1)
+        rows = np.repeat(np.arange(len(index)), kk)
+        cols = nbr[:, 1:].ravel()
+        order = np.argsort(dist[:, 1:].ravel(), kind='stable')
+        added = 0
+        for e in order:
+            i, j = int(index[rows[e]]), int(index[cols[e]])
+            if degree[i] >= 2 or degree[j] >= 2:
+                continue
+            ri, rj = find(i), find(j)
+            if ri == rj:
+                continue
+            parent[ri] = rj
+            degree[i] += 1
+            degree[j] += 1
+            adj[i].append(j)
+            adj[j].append(i)
+            added += 1
+        return added
+
+    add_edges(np.arange(n), min(k, n - 1))
+    while True:
+        ends = np.array([i for i in range(n) if degree[i] < 2])
+        # 只剩一条路径时端点为2个；单点片段只出现一次但度为0
+        if len(ends) <= 2 and len({find(int(i)) for i in ends}) == 1:
+            break
+        add_edges(ends, min(max(k, 2), len(ends) - 1))
+
+    start = int(ends[0])
+    path, prev = [start], -1
+    while len(path) < n:
+        cur = path[-1]
+        nxt = adj[cur][0] if adj[cur][0] != prev else adj[cur][1]
+        prev = cur
+        path.append(nxt)
+    return path
+
+
+def nearest_neighbor(points):
+    """
+    最近邻构造：网格空间索引，每个格子保存未访问城市，从当前城市所在格子向外逐圈搜索
+    """
+    coords = get_coords(points)
+    n = len(coords)
+    if n == 0:
+        return []
+    low = coords.min(axis=0)
+    span = max(float((coords.max(axis=0) - low).max()), 1e-9)
+    size = max(1, int(math.sqrt(n / 2)))
+    cell = span / size
+    cx = np.minimum(((coords[:, 0] - low[0]) / cell).astype(int), size - 1).tolist()
+    cy = np.minimum(((coords[:, 1] - low[1]) / cell).astype(int), size - 1).tolist()
+    xs, ys = coords[:, 0].tolist(), coords[:, 1].tolist()
+    grid = {}
+    slot = [0] * n
+    for i in range(n):
+        bucket = grid.setdefault((cx[i], cy[i]), [])
+        slot[i] = len(bucket)
+        bucket.append(i)
+
+    def remove(i):
+        bucket = grid[(cx[i], cy[i])]
+        last = bucket.pop()
+        if last != i:
+            bucket[slot[i]] = last
+            slot[last] = slot[i]
+
+    path = [0]
+    remove(0)
+    for _ in range(n - 1):
+        cur = path[-1]
+        best, best_d2 = -1, float('inf')
+        ring = 0
+        while ring <= size:
+            # 第ring圈格子中的城市与当前城市的距离至少为(ring-1)*cell
+            if best >= 0 and ring > 1 and ((ring - 1) * cell) ** 2 > best_d2:
+                break
+            for gx in range(cx[cur] - ring, cx[cur] + ring + 1):
+                if gx in (cx[cur] - ring, cx[cur] + ring):
+                    rows = range(cy[cur] - ring, cy[cur] + ring + 1)
+                else:
+                    rows = (cy[cur] - ring, cy[cur] + ring)
+                for gy in rows:
+                    for j in grid.get((gx, gy), ()):
+                        d2 = (xs[j] - xs[cur]) ** 2 + (ys[j] - ys[cur]) ** 2
+                        if d2 < best_d2:
+                            best, best_d2 = j, d2
+            ring += 1
+        remove(best)
+        path.append(best)
+    return path
+
+
+def space_filling_curve(points, order=16):
+    """
+    Hilbert曲线排序：坐标量化到2^order网格后按Hilbert编号排序
+    """
+    coords = get_coords(points)
+    if len(coords) == 0:
+        return []
+    low = coords.min(axis=0)
+    span = max(float((coords.max(axis=0) - low).max()), 1e-9)
+    side = 2 ** order
+    x = np.minimum(((coords[:, 0] - low[0]) / span * (side - 1)).astype(np.int64), side - 1)
+    y = np.minimum(((coords[:, 1] - low[1]) / span * (side - 1)).astype(np.int64), side - 1)
+    d = np.zeros(len(coords), dtype=np.int64)
+    s = side // 2
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx) ^ ry)
+        # 按象限旋转/翻转坐标
+        flip = ~ry & rx
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = ~ry
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s //= 2
+    return np.argsort(d, kind='stable').tolist()
+
+
+def mst_doubling(points):
+    """
+    类Christofides的MST倍增构造：在Delaunay三角剖分的边上求最小生成树，深度优先先序遍历并跳过重复城市
+    """
+    coords = get_coords(points)
+    n = len(coords)
+    if n <= 3:
+        return list(range(n))
+    try:
+        simplices = Delaunay(coords).simplices
+        edges = np.vstack([simplices[:, [0, 1]], simplices[:, [1, 2]], simplices[:, [0, 2]]])
+    except QhullError:
+        # 共线等退化情况使用k近邻图
+        _, nbr = cKDTree(coords).query(coords, k=min(10, n - 1) + 1)
+        edges = np.column_stack([np.repeat(np.arange(n), nbr.shape[1] - 1), nbr[:, 1:].ravel()])
+    edges = np.unique(np.sort(edges, axis=1), axis=0)
+    # 重合点距离为0会被稀疏矩阵当作无边，加一个极小量
+    length = np.linalg.norm(coords[edges[:, 0]] - coords[edges[:, 1]], axis=1) + 1e-12
+    graph = coo_matrix((length, (edges[:, 0], edges[:, 1])), shape=(n, n))
+    tree = minimum_spanning_tree(graph)
+    tree = tree + tree.T
+    order = depth_first_order(tree, 0, directed=False, return_predecessors=False)
+    if len(order) < n:
+        # k近邻图不连通时剩余城市按Hilbert顺序接在后面
+        seen = set(order.tolist())
+        return order.tolist() + [i for i in space_filling_curve(points) if i not in seen]
+    return order.tolist()
+
+
+CONSTRUCTORS = {
+    'greedy': greedy_edge,
+    'nearest': nearest_neighbor,
+    'sfc': space_filling_curve,
+    'mst': mst_doubling,
+}
+
+
+def construct(points, method='greedy'):
+    return CONSTRUCTORS[method](points)
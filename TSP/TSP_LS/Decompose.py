@@ -0,0 +1,101 @@
+"""
+Spatial decomposition for very large TSP instances
+author：carrot
+time：10/1/2023
+"""
+import math
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from scipy.cluster.vq import kmeans2
+from ILS_TSP import Point, read, plot
+from Local2opt import Local2opt
+from LK import LinKernighan
+from Tour import create_tour
+from Construct import construct, space_filling_curve
+
+
+def grid_partition(coords, num_cluster):
+    # 按包围盒长宽比划分网格，格子按蛇形顺序排列，保证相邻簇在空间上相邻
+    low, high = coords.min(axis=0), coords.max(axis=0)
+    width, height = np.maximum(high - low, 1e-9)
+    nx = max(1, int(round(math.sqrt(num_cluster * width / height))))
+    ny = max(1, int(math.ceil(num_cluster / nx)))
+    cx = np.minimum(((coords[:, 0] - low[0]) / width * nx).astype(int), nx - 1)
+    cy = np.minimum(((coords[:, 1] - low[1]) / height * ny).astype(int), ny - 1)
+    cx = np.where(cy % 2 == 0, cx, nx - 1 - cx)
+    labels = cy * nx + cx
+    return [np.flatnonzero(labels == c) for c in np.unique(labels)]
+
+
+def kmeans_partition(coords, num_cluster, seed=0):
+    # k-means聚类，簇按中心点的Hilbert顺序排列
+    centroids, labels = kmeans2(coords, num_cluster, seed=seed, minit='++')
+    order = space_filling_curve([Point(i, x, y) for i, (x, y) in enumerate(centroids)])
+    return [idx for idx in (np.flatnonzero(labels == c) for c in order) if len(idx)]
+
+
+def solve_cluster(args):
+    # 子进程：对一个簇构造初始解并做局部搜索，返回全局城市编号的子环路
+    index, coords, local_search, k = args
+    points = [Point(i, float(x), float(y)) for i, (x, y) in enumerate(coords)]
+    if len(points) <= 3:
+        return index.tolist()
+    init = construct(points, 'greedy')
+    if local_search == 'lk':
+        path, _ = LinKernighan(points, init).lin_kernighan(k)
+    else:
+        path, _ = Local2opt(points, init).or_opt(k)
+    return index[path].tolist()
+
+
+def join_tours(sub_tours, coords):
+    # 每个子环路在离下一簇最近的城市处断开，并选择使入口离上一簇出口更近的方向
+    path = []
+    for c, sub in enumerate(sub_tours):
+        sub_coords = coords[sub]
+        target = coords[sub_tours[(c + 1) % len(sub_tours)]].mean(axis=0)
+        exit_pos = int(np.argmin(((sub_coords - target) ** 2).sum(axis=1)))
+        forward = sub[exit_pos + 1:] + sub[:exit_pos + 1]
+        backward = forward[-2::-1] + forward[-1:] if len(forward) > 1 else forward
+        if path:
+            last = coords[path[-1]]
+            if ((coords[backward[0]] - last) ** 2).sum() < ((coords[forward[0]] - last) ** 2).sum():
+                forward = backward
+        path.extend(forward)
+    return path
+
+
+def decompose_search(node_count, points, cluster_size=5000, method='grid', workers=None,
+                     local_search='or_opt', k=10, seed=0):
+    """
+    分解求解：把城市划分成若干簇(grid或kmeans)，多进程并行求解各簇的子环路，
+    按簇顺序拼接后只对簇边界附近的城市(近邻落在其他簇中)做一次改进
+    """
+    coords = np.array([[p.x, p.y] for p in points], dtype=float)
+    num_cluster = max(1, int(math.ceil(node_count / cluster_size)))
+    if method == 'kmeans':
+        clusters = kmeans_partition(coords, num_cluster, seed)
+    else:
+        clusters = grid_partition(coords, num_cluster)
+    tasks = [(index, coords[index], local_search, k) for index in clusters]
+    with Pool(min(workers or cpu_count(), len(tasks))) as pool:
+        sub_tours = pool.map(solve_cluster, tasks)
+    path = join_tours(sub_tours, coords)
+
+    # 边界改进：只激活近邻中含有其他簇城市的城市
+    label = np.empty(node_count, dtype=int)
+    for c, index in enumerate(clusters):
+        label[index] = c
+    neighbors = Local2opt.neighbor_lists(points, k)
+    boundary = [i for i in range(node_count) if any(label[j] != label[i] for j in neighbors[i])]
+    opt = Local2opt(points, path)
+    tour = create_tour(path, opt.dist)
+    opt.descent(tour, neighbors, (opt.try_two_opt, opt.try_or_opt), boundary)
+    print(f'clusters:{len(clusters)}, boundary cities:{len(boundary)}, length:{tour.length}')
+    return tour.to_list(), tour.length
+
+
+if __name__ == '__main__':
+    node_count, points = read('../TSP_Gurobi/Berlin52.txt')
+    p, d = decompose_search(node_count, points, cluster_size=20)
+    plot(p, points)
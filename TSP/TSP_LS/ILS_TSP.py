@@ -8,6 +8,9 @@ import random
 import matplotlib.pyplot as plt
 from collections import namedtuple
 from Local2opt import Local2opt
+from LK import LinKernighan
+from Tour import create_tour
+from Construct import construct
 
 Point = namedtuple('Point', ['index', 'x', 'y'])
 
@@ -25,8 +28,11 @@ def read(path):
     return node_count, points
 
 
-def generate_initial_solution(node_count):
-    return np.random.permutation(node_count)
+def generate_initial_solution(node_count, points=None, method='random'):
+    # method可选'random'或Construct.py中的构造方法：'greedy'、'nearest'、'sfc'、'mst'
+    if method == 'random':
+        return np.random.permutation(node_count)
+    return construct(points, method)
 
 
 def perturb(path):
@@ -37,14 +43,43 @@ def perturb(path):
     return path[:part_one] + path[part_three:] + path[part_two:part_three] + path[part_one:part_two]
 
 
-def iterated_local_search(node_count, points, max_search):
-    init_path = generate_initial_solution(node_count)
-    opt = Local2opt(points, init_path)
-    best_path, best_dist = opt.two_opt()
+def iterated_local_search(node_count, points, max_search, local_search='2opt', k=10, incremental=False,
+                          init='random'):
+    """
+    local_search='2opt'为原始的全邻域2-opt；
+    'neighbor'为基于Tour数组的候选列表2-opt，近邻列表只计算一次，移动过程中不再复制路径；
+    'or_opt'在'neighbor'的基础上加入Or-opt片段插入移动，每次迭代得到更强的局部最优；
+    'lk'使用LK.py中的Lin-Kernighan变深度搜索；
+    incremental=True时使用增量模式，全部基于近邻列表，'2opt'与'neighbor'相同；
+    init为初始解的构造方法，见generate_initial_solution
+    """
+    if incremental:
+        init_path = generate_initial_solution(node_count, points, init)
+        return incremental_local_search(node_count, points, max_search, local_search, k, init_path=init_path)
+    if local_search == 'neighbor':
+        neighbors = Local2opt.neighbor_lists(points, k)
+
+        def search(path):
+            return Local2opt(points, path).two_opt_neighbor(neighbors=neighbors)
+    elif local_search == 'or_opt':
+        neighbors = Local2opt.neighbor_lists(points, k)
+
+        def search(path):
+            return Local2opt(points, path).or_opt(neighbors=neighbors)
+    elif local_search == 'lk':
+        neighbors = Local2opt.neighbor_lists(points, k)
+
+        def search(path):
+            return LinKernighan(points, path).lin_kernighan(neighbors=neighbors)
+    else:
+        def search(path):
+            return Local2opt(points, path).two_opt()
+
+    init_path = generate_initial_solution(node_count, points, init)
+    best_path, best_dist = search(init_path)
     for i in range(max_search):
         current_path = perturb(best_path)
-        opt = Local2opt(points, current_path)
-        new_path, new_dist = opt.two_opt()
+        new_path, new_dist = search(current_path)
         if new_dist < best_dist:
             best_path = new_path
             best_dist = new_dist
@@ -53,6 +88,48 @@ def iterated_local_search(node_count, points, max_search):
     return best_path, best_dist
 
 
+# 增量模式下各local_search使用的LinKernighan移动
+INCREMENTAL_MOVES = {'2opt': ('try_two_opt',),
+                     'neighbor': ('try_two_opt',),
+                     'or_opt': ('try_two_opt', 'try_or_opt'),
+                     'lk': ('try_lk', 'try_or_opt')}
+
+
+def incremental_local_search(node_count, points, max_search, local_search='or_opt', k=10,
+                             init_path=None, neighbors=None, dist_matrix=None, verbose=True):
+    """
+    增量ILS：整个搜索过程只维护一个Tour和一个优化器
+    每次在Tour上做局部double-bridge扰动，只重新激活扰动涉及的端点，下降后若没有改进则按移动日志回滚
+    每次迭代的代价约为O(k·片段长度)，与n无关
+    init_path/neighbors/dist_matrix可由调用方提供(如并行模式中的共享数据)
+    """
+    if local_search not in INCREMENTAL_MOVES:
+        raise ValueError(f'unknown local_search {local_search!r} for incremental mode, '
+                         f'expected one of {sorted(INCREMENTAL_MOVES)}')
+    if neighbors is None:
+        neighbors = Local2opt.neighbor_lists(points, k)
+    if init_path is None:
+        init_path = generate_initial_solution(node_count)
+    opt = LinKernighan(points, init_path, dist_matrix=dist_matrix)
+    moves = tuple(getattr(opt, name) for name in INCREMENTAL_MOVES[local_search])
+    tour = create_tour(init_path, opt.dist)
+    opt.descent(tour, neighbors, moves)
+    best_dist = tour.length
+    for i in range(max_search):
+        tour.log = []
+        touched = opt.kick(tour)
+        opt.descent(tour, neighbors, moves, touched)
+        new_dist = tour.length
+        if new_dist < best_dist - 1e-10:
+            best_dist = new_dist
+        else:
+            tour.rollback()
+        if verbose and i % 50 == 0:
+            print(f'number {i}, best:{best_dist}, new:{new_dist}')
+    tour.log = None
+    return tour.to_list(), tour.length
+
+
 def plot(path, points):
     for i in range(len(path)-1):
         node1 = path[i]
@@ -64,9 +141,10 @@ def plot(path, points):
     plt.show()
 
 
-node_count, points = read('../TSP_Gurobi/Berlin52.txt')
-p, d = iterated_local_search(node_count, points, 700)
-plot(p, points)
+if __name__ == '__main__':
+    node_count, points = read('../TSP_Gurobi/Berlin52.txt')
+    p, d = iterated_local_search(node_count, points, 700)
+    plot(p, points)
 
 
 
@@ -0,0 +1,102 @@
+"""
+Lin-Kernighan for TSP
+author：carrot
+time：10/1/2023
+"""
+import random
+from Local2opt import Local2opt
+
+
+class LinKernighan(Local2opt):
+    """
+    基于2-opt翻转的变深度LK搜索：每一步关闭当前断开边并打开新边，记录最优闭合点，其余翻转回滚
+    与Local2opt共用近邻列表、don't-look bits、Tour和Or-opt移动
+    """
+    def __init__(self, points, init, max_depth=50, breadth=3, dist_matrix=None):
+        super().__init__(points, init, dist_matrix)
+        self.max_depth = max_depth
+        self.breadth = breadth
+
+    def lin_kernighan(self, k=10, neighbors=None, tour=None):
+        return self.neighbor_search(k, neighbors, tour, (self.try_lk, self.try_or_opt))
+
+    def try_lk(self, tour, t1, neighbors):
+        # 以t1为起点尝试LK移动，成功时返回涉及的城市
+        for t2 in (tour.next(t1), tour.prev(t1)):
+            first_steps = 0
+            for t3 in neighbors[t2]:
+                if self.dist(t1, t2) - self.dist(t2, t3) <= 0 or first_steps >= self.breadth:
+                    break
+                touched = self.lk_chain(tour, t1, t2, t3, neighbors)
+                if touched:
+                    return touched
+                first_steps += 1
+        return None
+
+    def lk_chain(self, tour, t1, t2, t3, neighbors):
+        # 第一步固定为t3，之后每一步贪心选择收益最大的t3，最后回滚到最优闭合点
+        g = self.dist(t1, t2)
+        flips = []
+        touched = [t1, t2]
+        added = set()
+        best_gain, best_len = 1e-10, 0
+        for depth in range(self.max_depth):
+            succ = tour.next(t1) == t2
+            if depth > 0:
+                t3 = self.best_step(tour, t1, t2, g, neighbors, succ, added)
+                if t3 is None:
+                    break
+            t4 = tour.prev(t3) if succ else tour.next(t3)
+            if t3 in (t1, t2) or t4 in (t1, t2) or (min(t3, t4), max(t3, t4)) in added:
+                break
+            # 删除(t1,t2)(t4,t3)，加入(t2,t3)(t1,t4)，t4成为新的断开端点
+            self.exchange(tour, t1, t2, t4, t3)
+            flips.append((t2, t3, t4))
+            added.add((min(t2, t3), max(t2, t3)))
+            touched.extend((t3, t4))
+            g += self.dist(t4, t3) - self.dist(t2, t3)
+            t2 = t4
+            if g - self.dist(t1, t2) > best_gain:
+                best_gain, best_len = g - self.dist(t1, t2), len(flips)
+        # 回滚最优闭合点之后的翻转
+        while len(flips) > best_len:
+            t2, t3, t4 = flips.pop()
+            self.exchange(tour, t1, t4, t2, t3)
+        return touched if best_len > 0 else None
+
+    def best_step(self, tour, t1, t2, g, neighbors, succ, added):
+        best, best_value = None, -float('inf')
+        for t3 in neighbors[t2]:
+            g1 = g - self.dist(t2, t3)
+            if g1 <= 0:
+                break
+            t4 = tour.prev(t3) if succ else tour.next(t3)
+            if t3 in (t1, t2) or t4 in (t1, t2) or (min(t3, t4), max(t3, t4)) in added:
+                continue
+            value = g1 + self.dist(t3, t4)
+            if value > best_value:
+                best, best_value = t3, value
+        return best
+
+    def kick(self, tour, rng=random, segment_len=50):
+        """
+        局部double-bridge扰动：交换随机位置附近两段相邻片段 p B C n -> p C B n
+        返回涉及的城市，用于重新激活don't-look bits
+        """
+        segment_len = max(1, min(segment_len, (self.num_point - 2) // 2))
+        p = rng.randrange(self.num_point)
+        b1 = tour.next(p)
+        b2 = b1
+        for _ in range(rng.randint(0, segment_len - 1)):
+            b2 = tour.next(b2)
+        c1 = tour.next(b2)
+        c2 = c1
+        for _ in range(rng.randint(0, segment_len - 1)):
+            c2 = tour.next(c2)
+        n = tour.next(c2)
+        if n == p:
+            return []
+        self.exchange(tour, p, b1, c2, n)
+        self.exchange(tour, p, c2, c1, b2)
+        self.exchange(tour, c2, b2, b1, n)
+        return [p, b1, b2, c1, c2, n]
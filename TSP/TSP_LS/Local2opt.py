@@ -3,19 +3,40 @@
 author：carrot
 time：10/1/2023
 """
+import os
+import sys
 import numpy as np
 import math
+from collections import deque
+from scipy.spatial import cKDTree
+from Tour import create_tour
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from Common.Distance import distance_matrix
 
 
 class Local2opt(object):
-    def __init__(self, points, init):
+    def __init__(self, points, init, dist_matrix=None):
         self.points = points
         self.num_point = len(points)
         self.init_path = init
+        self.xs = [p.x for p in points]
+        self.ys = [p.y for p in points]
+        self.tour = None
+        self.active = None
 
         self.best_path = []
         self.best_dist = 0
 
+        # 向量化引擎使用的坐标和距离矩阵，首次使用时计算
+        self.coords = None
+        self.dist_matrix = None
+        # 传入距离矩阵(如共享内存中的矩阵)时，dist改为按行优先的扁平视图直接查表
+        self.dist_flat = None
+        if dist_matrix is not None:
+            self.dist_matrix = dist_matrix
+            self.dist_flat = memoryview(np.ascontiguousarray(dist_matrix, dtype=np.float64)).cast('B').cast('d')
+            self.dist = self.matrix_dist
+
     def update(self, path, dist):
         self.best_path = path
         self.best_dist = dist
@@ -43,6 +64,175 @@ class Local2opt(object):
             improvement_factor = 1 - self.best_dist / pre_best
         return self.best_path, self.best_dist
 
+    def get_dist_matrix(self):
+        if self.dist_matrix is None:
+            self.coords = np.array([[p.x, p.y] for p in self.points], dtype=float)
+            self.dist_matrix = np.asarray(distance_matrix(self.coords))
+        return self.dist_matrix
+
+    def two_opt_vector(self, improvement_threshold=0.001, strategy='best'):
+        """
+        NumPy向量化的2-opt
+        对每个锚点one，一次性计算所有two的移动收益，strategy='best'取收益最大的移动，'first'取第一个改进移动
+        """
+        dist = self.get_dist_matrix()
+        path = np.array(self.init_path, dtype=int)
+        self.best_dist = float(dist[path, np.roll(path, -1)].sum())
+        improvement_factor = 1
+
+        while improvement_factor > improvement_threshold:
+            pre_best = self.best_dist
+            for one in range(1, self.num_point - 2):
+                a, b = path[one - 1], path[one]
+                c = path[one + 1:self.num_point - 1]
+                d = path[one + 2:self.num_point]
+                delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+                if strategy == 'best':
+                    idx = int(np.argmin(delta))
+                else:
+                    improving = np.flatnonzero(delta < -1e-10)
+                    idx = int(improving[0]) if len(improving) else 0
+                if delta[idx] < -1e-10:
+                    two = one + 1 + idx
+                    path[one:two + 1] = path[one:two + 1][::-1]
+                    self.best_dist += float(delta[idx])
+            improvement_factor = 1 - self.best_dist / pre_best
+        self.best_path = path.tolist()
+        return self.best_path, self.best_dist
+
+    def two_opt_neighbor(self, k=10, neighbors=None, tour=None):
+        """
+        候选列表 + don't-look bits 的 2-opt
+        只尝试新边连接到k近邻的移动，未改进过的城市不再检查，每轮约O(n·k)
+        tour为Tour对象时在其上原地优化，否则由init_path创建
+        """
+        return self.neighbor_search(k, neighbors, tour, (self.try_two_opt,))
+
+    def or_opt(self, k=10, neighbors=None, tour=None, segment_len=3):
+        """
+        2-opt + Or-opt：在2-opt的基础上把1~segment_len个城市的片段正向或反向插入到近邻处(片段插入型3-opt)
+        与two_opt_neighbor共用近邻列表、don't-look bits和增量长度
+        """
+        def try_or_opt(tour, a, neighbors):
+            return self.try_or_opt(tour, a, neighbors, segment_len)
+        return self.neighbor_search(k, neighbors, tour, (self.try_two_opt, try_or_opt))
+
+    def neighbor_search(self, k, neighbors, tour, moves):
+        if neighbors is None:
+            neighbors = self.neighbor_lists(self.points, k)
+        if tour is None:
+            tour = create_tour(self.init_path, self.dist)
+        self.descent(tour, neighbors, moves)
+        self.tour = tour
+        self.best_path = tour.to_list()
+        self.best_dist = tour.length
+        return self.best_path, self.best_dist
+
+    def descent(self, tour, neighbors, moves, start=None):
+        """
+        在tour上原地下降到局部最优
+        start为None时检查所有城市，否则只激活start中的城市(如扰动涉及的端点)
+        don't-look bits保存在self.active中，多次调用之间复用
+        """
+        # don't-look bits：active为False的城市不再检查，队列中只保存待检查城市
+        if self.active is None:
+            self.active = [False] * self.num_point
+        active = self.active
+        queue = deque()
+        for city in (tour.to_list() if start is None else start):
+            if not active[city]:
+                active[city] = True
+                queue.append(city)
+        while queue:
+            a = queue.popleft()
+            active[a] = False
+            for move in moves:
+                touched = move(tour, a, neighbors)
+                if touched:
+                    for city in touched:
+                        if not active[city]:
+                            active[city] = True
+                            queue.append(city)
+                    break
+
+    def try_two_opt(self, tour, a, neighbors):
+        # 尝试以a为端点的改进2-opt移动，成功时返回涉及的城市
+        for succ in (True, False):
+            b = tour.next(a) if succ else tour.prev(a)
+            d_ab = self.dist(a, b)
+            for c in neighbors[a]:
+                # 近邻按距离升序，g1<=0后不可能再有改进
+                g1 = d_ab - self.dist(a, c)
+                if g1 <= 0:
+                    break
+                d = tour.next(c) if succ else tour.prev(c)
+                if c == b or d == a:
+                    continue
+                if self.dist(b, d) - self.dist(c, d) < g1 - 1e-10:
+                    # 正向：a b ... c d -> a c ... b d；反向：d c ... b a -> d b ... c a
+                    if succ:
+                        tour.move(a, b, c, d)
+                    else:
+                        tour.move(b, a, d, c)
+                    return a, b, c, d
+        return None
+
+    def try_or_opt(self, tour, a, neighbors, segment_len=3):
+        # 尝试移动以a为端点、长度1~segment_len的片段，成功时返回涉及的城市
+        for length in range(1, segment_len + 1):
+            for succ in (True, False):
+                # 片段沿正方向为s1...s2
+                other = a
+                for _ in range(length - 1):
+                    other = tour.next(other) if succ else tour.prev(other)
+                s1, s2 = (a, other) if succ else (other, a)
+                segment = [s1]
+                while segment[-1] != s2:
+                    segment.append(tour.next(segment[-1]))
+                p, n = tour.prev(s1), tour.next(s2)
+                if p in segment or n in segment or p == n:
+                    continue
+                g = self.dist(p, s1) + self.dist(s2, n) - self.dist(p, n)
+                for end in (s1, s2):
+                    for c in neighbors[end]:
+                        g1 = g - self.dist(end, c)
+                        if g1 <= 0:
+                            break
+                        if c in segment:
+                            continue
+                        for x, y in ((c, tour.next(c)), (tour.prev(c), c)):
+                            if x in segment or y in segment:
+                                continue
+                            # 新边(end,c)确定片段插入方向：reverse时加入(x,s2)(s1,y)，否则加入(x,s1)(s2,y)
+                            other_end = s2 if end == s1 else s1
+                            outside = y if c == x else x
+                            delta = self.dist(other_end, outside) - self.dist(x, y) - g1
+                            if delta < -1e-10:
+                                reverse = (end == s2) == (c == x)
+                                self.insert_segment(tour, s1, s2, x, y, reverse)
+                                return p, n, s1, s2, x, y
+        return None
+
+    def insert_segment(self, tour, s1, s2, x, y, reverse):
+        # 用2-3次2-opt移动把片段s1...s2插入到边(x,y)之间，Tour自动维护增量长度
+        p, n = tour.prev(s1), tour.next(s2)
+        if y != p:
+            self.exchange(tour, p, s1, x, y)
+            if x != n:
+                self.exchange(tour, p, x, n, s2)
+        else:
+            self.exchange(tour, x, y, s2, n)
+        if not reverse:
+            self.exchange(tour, x, s2, s1, y)
+
+    @staticmethod
+    def exchange(tour, a, b, c, d):
+        # 删除同方向的边(a,b)(c,d)，加入(a,c)(b,d)，与tour当前方向无关
+        if tour.next(a) == b:
+            tour.move(a, b, c, d)
+        else:
+            tour.move(b, a, d, c)
+
     def calculate_dist(self, path):
         path_dist = 0
         for i in range(len(path) - 1):
@@ -52,6 +242,12 @@ class Local2opt(object):
         path_dist += self.length(self.points[path[-1]], self.points[path[0]])
         return path_dist
 
+    def dist(self, a, b):
+        return math.sqrt((self.xs[a] - self.xs[b]) ** 2 + (self.ys[a] - self.ys[b]) ** 2)
+
+    def matrix_dist(self, a, b):
+        return self.dist_flat[a * self.num_point + b]
+
     def valid(self, path):
         return (len(set(path)) == self.num_point) and (sorted(path) == list(range(self.num_point)))
 
@@ -60,6 +256,14 @@ class Local2opt(object):
         a = np.concatenate((path[0:one], path[two:-len(path) + one - 1:-1], path[two + 1:])).astype(int)
         return a.tolist()
 
+    @staticmethod
+    def neighbor_lists(points, k):
+        # KD-tree求每个城市的k近邻(按距离升序，不含自身)
+        coords = np.array([[p.x, p.y] for p in points])
+        k = min(k, len(points) - 1)
+        _, index = cKDTree(coords).query(coords, k=k + 1)
+        return [[int(c) for c in row if c != i][:k] for i, row in enumerate(index)]
+
     @staticmethod
     def length(point1, point2):
         return math.sqrt((point1.x - point2.x) ** 2 + (point1.y - point2.y) ** 2)
\ No newline at end of file
@@ -0,0 +1,109 @@
+"""
+Parallel multi-start ILS for TSP
+author：carrot
+time：10/1/2023
+"""
+import os
+import sys
+import random
+import numpy as np
+from multiprocessing import Pool, cpu_count
+from multiprocessing.shared_memory import SharedMemory
+from ILS_TSP import Point, read, plot, generate_initial_solution, incremental_local_search
+from Local2opt import Local2opt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '../..'))
+from Common.Distance import distance_matrix
+
+# 子进程中挂载的共享数据：坐标、近邻列表、距离矩阵(可选)
+shared = {}
+
+
+def create_shared(array):
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    view = np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)
+    view[:] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def attach_shared(meta):
+    name, shape, dtype = meta
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def init_worker(coords_meta, neighbors_meta, matrix_meta):
+    # 每个子进程只挂载一次共享内存，坐标和近邻列表转换成搜索使用的结构
+    for key, meta in (('coords', coords_meta), ('neighbors', neighbors_meta), ('matrix', matrix_meta)):
+        if meta is None:
+            shared[key] = None
+            continue
+        shm, array = attach_shared(meta)
+        shared[key + '_shm'] = shm
+        shared[key] = array
+    shared['points'] = [Point(i + 1, float(x), float(y)) for i, (x, y) in enumerate(shared['coords'])]
+    shared['neighbor_lists'] = shared['neighbors'].tolist()
+
+
+def run_worker(args):
+    worker, seed, init_path, max_search, local_search = args
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+    points = shared['points']
+    path, dist = incremental_local_search(len(points), points, max_search, local_search,
+                                          init_path=init_path, neighbors=shared['neighbor_lists'],
+                                          dist_matrix=shared['matrix'], verbose=False)
+    return worker, path, dist
+
+
+def parallel_local_search(node_count, points, max_search, workers=None, seed=0, rounds=1,
+                          local_search='or_opt', k=10, share_matrix=None, init='random'):
+    """
+    多进程多起点ILS：每个进程以不同种子运行增量ILS
+    坐标、近邻列表和距离矩阵放在multiprocessing.shared_memory中，子进程直接挂载而不是逐个pickle
+    rounds>1时每轮结束后把当前最优路径同步给所有进程作为下一轮的起点
+    给定seed和workers时结果确定；init不为'random'时所有进程从同一个构造解出发
+    """
+    workers = workers or cpu_count()
+    if share_matrix is None:
+        share_matrix = node_count <= 5000
+    coords = np.array([[p.x, p.y] for p in points], dtype=np.float64)
+    neighbors = np.array(Local2opt.neighbor_lists(points, k), dtype=np.int32)
+    blocks = []
+    try:
+        coords_shm, coords_meta = create_shared(coords)
+        neighbors_shm, neighbors_meta = create_shared(neighbors)
+        blocks.extend([coords_shm, neighbors_shm])
+        matrix_meta = None
+        if share_matrix:
+            matrix_shm, matrix_meta = create_shared(np.asarray(distance_matrix(coords)))
+            blocks.append(matrix_shm)
+
+        # 每个进程的种子只由seed、轮次和进程编号决定
+        np.random.seed(seed)
+        if init == 'random':
+            starts = [generate_initial_solution(node_count).tolist() for _ in range(workers)]
+        else:
+            starts = [generate_initial_solution(node_count, points, init)] * workers
+        iterations = max(1, max_search // rounds)
+        best_path, best_dist, best_worker = None, float('inf'), None
+        with Pool(workers, initializer=init_worker, initargs=(coords_meta, neighbors_meta, matrix_meta)) as pool:
+            for r in range(rounds):
+                tasks = [(w, seed * 1000003 + r * 1009 + w, starts[w], iterations, local_search)
+                         for w in range(workers)]
+                for worker, path, dist in pool.imap_unordered(run_worker, tasks):
+                    # 距离相同时取编号小的进程，保证收集顺序不影响结果
+                    if dist < best_dist - 1e-9 or (abs(dist - best_dist) <= 1e-9 and worker < best_worker):
+                        best_path, best_dist, best_worker = path, dist, worker
+                        print(f'round {r}, worker {worker}, best:{best_dist}')
+                starts = [best_path] * workers
+    finally:
+        for shm in blocks:
+            shm.close()
+            shm.unlink()
+    return best_path, best_dist
+
+
+if __name__ == '__main__':
+    node_count, points = read('../TSP_Gurobi/Berlin52.txt')
+    p, d = parallel_local_search(node_count, points, 700, workers=4, rounds=2)
+    plot(p, points)
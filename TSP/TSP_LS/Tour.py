@@ -0,0 +1,350 @@
+"""
+Tour representation for TSP local search
+author：carrot
+time：10/1/2023
+"""
+import math
+
+
+class Tour(object):
+    """
+    环路表示的公共部分：2-opt移动、增量长度和移动日志
+    log不为None时记录每次移动，rollback可按相反顺序撤销到指定位置
+    """
+    log = None
+
+    def move(self, a, b, c, d):
+        # 2-opt移动：b=next(a)，d=next(c)，删除(a,b)(c,d)，加入(a,c)(b,d)，返回长度变化
+        delta = self.dist(a, c) + self.dist(b, d) - self.dist(a, b) - self.dist(c, d)
+        self.flip(b, c)
+        self.length += delta
+        if self.log is not None:
+            self.log.append((a, b, c, d))
+        return delta
+
+    def rollback(self, mark=0):
+        # 撤销日志中mark之后的所有移动：删除(a,c)(b,d)，恢复(a,b)(c,d)
+        log, self.log = self.log, None
+        while len(log) > mark:
+            a, b, c, d = log.pop()
+            if self.next(a) == c:
+                self.move(a, c, b, d)
+            else:
+                self.move(c, a, d, b)
+        self.log = log
+
+
+class ArrayTour(Tour):
+    """
+    数组表示的环路：order[i]为第i个城市，pos[c]为城市c的位置
+    next/prev/between均为O(1)，flip原地翻转较短的一侧
+    """
+    def __init__(self, path, dist):
+        self.num_point = len(path)
+        self.order = [int(c) for c in path]
+        self.pos = [0] * self.num_point
+        for i, city in enumerate(self.order):
+            self.pos[city] = i
+        self.dist = dist
+        self.length = sum(dist(self.order[i - 1], self.order[i]) for i in range(self.num_point))
+
+    def next(self, city):
+        return self.order[(self.pos[city] + 1) % self.num_point]
+
+    def prev(self, city):
+        return self.order[self.pos[city] - 1]
+
+    def between(self, a, b, c):
+        # 从a出发沿正方向走到c时是否经过b
+        pa, pb, pc = self.pos[a], self.pos[b], self.pos[c]
+        if pa <= pc:
+            return pa <= pb <= pc
+        return pb >= pa or pb <= pc
+
+    def flip(self, b, c):
+        # 翻转正方向上b到c的路径，若另一侧更短则翻转另一侧(环路相同，方向相反)
+        n = self.num_point
+        i, j = self.pos[b], self.pos[c]
+        inner = (j - i) % n + 1
+        if 2 * inner > n:
+            i, j = (j + 1) % n, (i - 1) % n
+            inner = n - inner
+        order, pos = self.order, self.pos
+        for _ in range(inner // 2):
+            order[i], order[j] = order[j], order[i]
+            pos[order[i]] = i
+            pos[order[j]] = j
+            i += 1
+            if i == n:
+                i = 0
+            j -= 1
+            if j < 0:
+                j = n - 1
+
+    def to_list(self):
+        return list(self.order)
+
+    def valid(self):
+        seen = [False] * self.num_point
+        for city in self.order:
+            if seen[city]:
+                return False
+            seen[city] = True
+        return True
+
+
+class TwoLevelTour(Tour):
+    """
+    两级双向链表表示的环路，适用于大规模实例
+    城市被分成约sqrt(n)个片段，每个片段有翻转标记；flip只需移动片段边界上的少量城市并重连片段，
+    单次flip为O(sqrt(n))，next/prev/between为O(1)
+    """
+    def __init__(self, path, dist, group_size=None):
+        self.num_point = n = len(path)
+        self.dist = dist
+        path = [int(c) for c in path]
+        if group_size is None:
+            group_size = max(8, int(math.sqrt(n)))
+        num_seg = (n + group_size - 1) // group_size
+
+        # 城市层：所属片段、片段内序号、片段内部方向上的前驱/后继
+        self.seg = [0] * n
+        self.seq = [0] * n
+        self.nxt = [-1] * n
+        self.prv = [-1] * n
+        # 片段层：翻转标记、内部方向的首尾城市、环路方向上的前后片段、片段在环中的排名
+        self.num_seg = num_seg
+        self.rev = [False] * num_seg
+        self.first = [0] * num_seg
+        self.last = [0] * num_seg
+        self.size = [0] * num_seg
+        self.snext = [(s + 1) % num_seg for s in range(num_seg)]
+        self.sprev = [(s - 1) % num_seg for s in range(num_seg)]
+        self.rank = list(range(num_seg))
+
+        for s in range(num_seg):
+            part = path[s * group_size:(s + 1) * group_size]
+            self.first[s], self.last[s], self.size[s] = part[0], part[-1], len(part)
+            for idx, city in enumerate(part):
+                self.seg[city] = s
+                self.seq[city] = idx
+                self.prv[city] = part[idx - 1] if idx > 0 else -1
+                self.nxt[city] = part[idx + 1] if idx + 1 < len(part) else -1
+        self.length = sum(dist(path[i - 1], path[i]) for i in range(n))
+
+    def head(self, s):
+        return self.last[s] if self.rev[s] else self.first[s]
+
+    def tail(self, s):
+        return self.first[s] if self.rev[s] else self.last[s]
+
+    def next(self, city):
+        s = self.seg[city]
+        if self.rev[s]:
+            return self.head(self.snext[s]) if city == self.first[s] else self.prv[city]
+        return self.head(self.snext[s]) if city == self.last[s] else self.nxt[city]
+
+    def prev(self, city):
+        s = self.seg[city]
+        if self.rev[s]:
+            return self.tail(self.sprev[s]) if city == self.last[s] else self.nxt[city]
+        return self.tail(self.sprev[s]) if city == self.first[s] else self.prv[city]
+
+    def key(self, city):
+        s = self.seg[city]
+        return self.rank[s], -self.seq[city] if self.rev[s] else self.seq[city]
+
+    def between(self, a, b, c):
+        ka, kb, kc = self.key(a), self.key(b), self.key(c)
+        if ka <= kc:
+            return ka <= kb <= kc
+        return kb >= ka or kb <= kc
+
+    def offset(self, city):
+        # 城市在所在片段中沿环路方向的位置
+        s = self.seg[city]
+        return abs(self.seq[city] - self.seq[self.head(s)])
+
+    def flip(self, b, c, shorter=True):
+        # 翻转正方向上b到c的路径
+        if b == c or self.next(c) == b:
+            return
+        sb, sc = self.seg[b], self.seg[c]
+        if sb == sc:
+            if self.offset(b) <= self.offset(c):
+                self.reverse_inside(b, c)
+            else:
+                self.reverse_inside(self.next(c), self.prev(b))
+            return
+        # 按片段数选择较短的一侧
+        span = (self.rank[sc] - self.rank[sb]) % self.num_seg + 1
+        if shorter and 2 * span > self.num_seg + 1:
+            self.flip(self.next(c), self.prev(b), shorter=False)
+            return
+        self.split_before(b)
+        sb, sc = self.seg[b], self.seg[c]
+        if sb == sc:
+            self.reverse_inside(b, c)
+            return
+        self.split_after(c, sb)
+        sb, sc = self.seg[b], self.seg[c]
+        if sb == sc:
+            self.reverse_inside(b, c)
+            return
+        self.reverse_segments(sb, sc)
+
+    def split_before(self, city):
+        # 使city成为所在片段的首城市：把较少的一部分城市移到相邻片段
+        s = self.seg[city]
+        if city == self.head(s):
+            return
+        before = self.offset(city)
+        if before <= self.size[s] - before:
+            self.move_head_to_prev(s, before)
+        else:
+            self.move_tail_to_next(s, self.size[s] - before)
+
+    def split_after(self, city, keep):
+        # 使city成为所在片段的尾城市，且不破坏片段keep的首城市
+        s = self.seg[city]
+        if city == self.tail(s):
+            return
+        upto = self.offset(city) + 1
+        rest = self.size[s] - upto
+        if upto <= rest or self.snext[s] == keep:
+            self.move_head_to_prev(s, upto)
+        else:
+            self.move_tail_to_next(s, rest)
+
+    def move_head_to_prev(self, s, count):
+        # 把片段s环路方向上的前count个城市追加到前一片段的尾部
+        p = self.sprev[s]
+        for _ in range(count):
+            city = self.head(s)
+            if self.rev[s]:
+                self.last[s] = self.prv[city]
+                self.nxt[self.last[s]] = -1
+            else:
+                self.first[s] = self.nxt[city]
+                self.prv[self.first[s]] = -1
+            self.size[s] -= 1
+            if self.rev[p]:
+                end = self.first[p]
+                self.prv[end], self.nxt[city], self.prv[city] = city, end, -1
+                self.seq[city] = self.seq[end] - 1
+                self.first[p] = city
+            else:
+                end = self.last[p]
+                self.nxt[end], self.prv[city], self.nxt[city] = city, end, -1
+                self.seq[city] = self.seq[end] + 1
+                self.last[p] = city
+            self.seg[city] = p
+            self.size[p] += 1
+
+    def move_tail_to_next(self, s, count):
+        # 把片段s环路方向上的后count个城市插入到后一片段的首部
+        q = self.snext[s]
+        for _ in range(count):
+            city = self.tail(s)
+            if self.rev[s]:
+                self.first[s] = self.nxt[city]
+                self.prv[self.first[s]] = -1
+            else:
+                self.last[s] = self.prv[city]
+                self.nxt[self.last[s]] = -1
+            self.size[s] -= 1
+            if self.rev[q]:
+                end = self.last[q]
+                self.nxt[end], self.prv[city], self.nxt[city] = city, end, -1
+                self.seq[city] = self.seq[end] + 1
+                self.last[q] = city
+            else:
+                end = self.first[q]
+                self.prv[end], self.nxt[city], self.prv[city] = city, end, -1
+                self.seq[city] = self.seq[end] - 1
+                self.first[q] = city
+            self.seg[city] = q
+            self.size[q] += 1
+
+    def reverse_inside(self, b, c):
+        # 翻转同一片段内b到c的路径：两端对换序号和链接位置
+        s = self.seg[b]
+        if self.rev[s]:
+            b, c = c, b
+        # 此时片段内部方向上b在前c在后
+        while b != c:
+            after_b, before_c = self.nxt[b], self.prv[c]
+            self.swap_inside(s, b, c)
+            if after_b == c:
+                break
+            b, c = after_b, before_c
+
+    def swap_inside(self, s, u, v):
+        # 交换片段内两个城市的位置(内部方向上u在v之前)
+        pu, nu, pv, nv = self.prv[u], self.nxt[u], self.prv[v], self.nxt[v]
+        self.seq[u], self.seq[v] = self.seq[v], self.seq[u]
+        if nu == v:
+            self.prv[v], self.nxt[v], self.prv[u], self.nxt[u] = pu, u, v, nv
+        else:
+            self.prv[v], self.nxt[v], self.prv[u], self.nxt[u] = pu, nu, pv, nv
+            self.prv[nu] = v
+            self.nxt[pv] = u
+        if pu != -1:
+            self.nxt[pu] = v
+        else:
+            self.first[s] = v
+        if nv != -1:
+            self.prv[nv] = u
+        else:
+            self.last[s] = u
+
+    def reverse_segments(self, sb, sc):
+        # 翻转从片段sb到片段sc的整段片段序列：翻转标记取反，逆序重连并重新编号
+        before, after = self.sprev[sb], self.snext[sc]
+        start = self.rank[sb]
+        s, count = sb, 0
+        while True:
+            self.rev[s] = not self.rev[s]
+            self.snext[s], self.sprev[s] = self.sprev[s], self.snext[s]
+            count += 1
+            if s == sc:
+                break
+            s = self.sprev[s]
+        s = sc
+        for i in range(count):
+            self.rank[s] = (start + i) % self.num_seg
+            s = self.snext[s]
+        if after == sb:
+            # 翻转覆盖了所有片段，环路整体反向
+            return
+        self.snext[before], self.sprev[sc] = sc, before
+        self.sprev[after], self.snext[sb] = sb, after
+
+    def to_list(self):
+        path = []
+        s = self.rank.index(0)
+        for _ in range(self.num_seg):
+            city = self.head(s)
+            while city != -1:
+                path.append(city)
+                city = self.prv[city] if self.rev[s] else self.nxt[city]
+            s = self.snext[s]
+        return path
+
+    def valid(self):
+        path = self.to_list()
+        seen = [False] * self.num_point
+        for city in path:
+            if seen[city]:
+                return False
+            seen[city] = True
+        return len(path) == self.num_point
+
+
+def create_tour(path, dist, two_level=None):
+    # 默认规模超过5万时使用两级链表
+    if two_level is None:
+        two_level = len(path) > 50000
+    if two_level:
+        return TwoLevelTour(path, dist)
+    return ArrayTour(path, dist)
@@ -0,0 +1,320 @@
+import os
+import sys
+import math
+import time
+import random
+import numpy as np
+import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+from Heuristic import read, insertion
+
+
+class ALNS(object):
+    """
+    自适应大邻域搜索：每次迭代用一个破坏算子(random/Shaw/worst)移除q个客户，再用一个修复算子(greedy/regret-k)插回，
+    按模拟退火准则接受，算子权重按近期得分自适应调整
+    每条路线缓存各位置的最早开始服务时间early和不影响后续客户的最晚开始服务时间late，
+    在(a, b)之间插入客户c时只需检查载重、c的时间窗和c到b的到达时间是否不晚于late[b]，每个候选位置O(1)
+    给定vehicle_count时修复算子仍可新开路线，但目标值中对每条多出的路线加penalty，搜索会先减少路线数
+    """
+
+    def __init__(self, points_list, vehicle_capacity, vehicle_count=None, seed=0, vehicle_cost=0.0):
+        self.points = points_list
+        self.n = len(points_list)
+        self.capacity = vehicle_capacity
+        self.vehicle_count = vehicle_count
+        self.vehicle_cost = vehicle_cost
+        self.matrix = np.asarray(distance_matrix([(p.x, p.y) for p in points_list]))
+        self.dist = self.matrix.tolist()
+        self.ready = [p.ready for p in points_list]
+        self.due = [p.due for p in points_list]
+        self.service = [p.service for p in points_list]
+        self.demand = [p.demand for p in points_list]
+        self.rng = random.Random(seed)
+        # Shaw相关性：距离、时间窗开始时间和需求分别归一化
+        self.max_dist = float(self.matrix.max()) or 1.0
+        self.max_time = float(max(self.due) - min(self.ready)) or 1.0
+        self.max_demand = float(max(self.demand)) or 1.0
+        # 多出一条路线的惩罚大于任何解的总距离
+        self.penalty = 2 * self.max_dist * self.n + 1
+        self.destroy_ops = [self.random_removal, self.shaw_removal, self.worst_removal]
+        self.repair_ops = [self.greedy_insertion, self.regret_insertion_2, self.regret_insertion_3]
+        self.routes, self.early, self.late, self.loads = [], [], [], []
+
+    '''
+    (1)路线缓存
+    '''
+
+    def load_routes(self, routes):
+        self.routes = [list(r) for r in routes if len(r) > 2]
+        self.early, self.late, self.loads = [], [], []
+        for r in range(len(self.routes)):
+            self.early.append(None)
+            self.late.append(None)
+            self.loads.append(0)
+            self.update_route(r)
+
+    def update_route(self, r):
+        route = self.routes[r]
+        d = self.dist
+        early = [self.ready[0]]
+        for a, b in zip(route, route[1:]):
+            early.append(max(self.ready[b], early[-1] + self.service[a] + d[a][b]))
+        late = [0.0] * len(route)
+        late[-1] = self.due[0]
+        for p in range(len(route) - 2, -1, -1):
+            a, b = route[p], route[p + 1]
+            late[p] = min(self.due[a], late[p + 1] - d[a][b] - self.service[a])
+        self.early[r], self.late[r] = early, late
+        self.loads[r] = sum(self.demand[c] for c in route)
+
+    def remove_empty(self):
+        keep = [r for r in range(len(self.routes)) if len(self.routes[r]) > 2]
+        self.routes = [self.routes[r] for r in keep]
+        self.early = [self.early[r] for r in keep]
+        self.late = [self.late[r] for r in keep]
+        self.loads = [self.loads[r] for r in keep]
+
+    def best_insertion(self, c, r):
+        # 返回客户c在路线r中的(最小增加距离, 位置)，不可行时返回(inf, -1)
+        if self.loads[r] + self.demand[c] > self.capacity:
+            return math.inf, -1
+        route, early, late = self.routes[r], self.early[r], self.late[r]
+        d, dc = self.dist, self.dist[c]
+        ready_c, due_c, service_c = self.ready[c], self.due[c], self.service[c]
+        best, best_p = math.inf, -1
+        for p in range(len(route) - 1):
+            a, b = route[p], route[p + 1]
+            start = early[p] + self.service[a] + d[a][c]
+            if start > due_c:
+                # 之后位置的early只会更大
+                break
+            if start < ready_c:
+                start = ready_c
+            if start + service_c + dc[b] > late[p + 1]:
+                continue
+            cost = d[a][c] + dc[b] - d[a][b]
+            if cost < best:
+                best, best_p = cost, p + 1
+        return best, best_p
+
+    def objective(self):
+        d = self.dist
+        total = sum(d[a][b] for route in self.routes for a, b in zip(route, route[1:]))
+        return total + self.vehicle_cost * len(self.routes)
+
+    def excess(self):
+        if self.vehicle_count is None:
+            return 0
+        return max(0, len(self.routes) - self.vehicle_count)
+
+    def cost(self):
+        return self.objective() + self.penalty * self.excess()
+
+    '''
+    (2)破坏算子
+    '''
+
+    def assigned(self):
+        return [c for route in self.routes for c in route[1:-1]]
+
+    def remove(self, customers):
+        removed = set(customers)
+        for r, route in enumerate(self.routes):
+            if any(c in removed for c in route[1:-1]):
+                self.routes[r] = [c for c in route if c not in removed]
+                self.update_route(r)
+        self.remove_empty()
+
+    def random_removal(self, q):
+        customers = self.rng.sample(self.assigned(), q)
+        self.remove(customers)
+        return customers
+
+    def shaw_removal(self, q, p=6):
+        # 从一个随机客户出发，反复移除与已移除客户最相关的客户，p越大越接近确定性选择
+        assigned = self.assigned()
+        removed = [self.rng.choice(assigned)]
+        rest = set(assigned) - set(removed)
+        while len(removed) < q:
+            seed = self.rng.choice(removed)
+            candidates = sorted(rest, key=lambda c: self.relatedness(seed, c))
+            c = candidates[int(len(candidates) * self.rng.random() ** p)]
+            removed.append(c)
+            rest.remove(c)
+        self.remove(removed)
+        return removed
+
+    def relatedness(self, i, j):
+        return (9 * self.dist[i][j] / self.max_dist + 3 * abs(self.ready[i] - self.ready[j]) / self.max_time
+                + 2 * abs(self.demand[i] - self.demand[j]) / self.max_demand)
+
+    def worst_removal(self, q, p=3):
+        # 依次移除节省距离最多的客户，带随机扰动
+        removed = []
+        while len(removed) < q:
+            gains = []
+            for route in self.routes:
+                for pos in range(1, len(route) - 1):
+                    a, c, b = route[pos - 1], route[pos], route[pos + 1]
+                    gains.append((self.dist[a][c] + self.dist[c][b] - self.dist[a][b], c))
+            gains.sort(reverse=True)
+            c = gains[int(len(gains) * self.rng.random() ** p)][1]
+            self.remove([c])
+            removed.append(c)
+        return removed
+
+    '''
+    (3)修复算子
+    '''
+
+    def insert(self, c, r, pos):
+        if r == len(self.routes):
+            self.routes.append([0, c, 0])
+            self.early.append(None)
+            self.late.append(None)
+            self.loads.append(0)
+        else:
+            self.routes[r].insert(pos, c)
+        self.update_route(r)
+
+    def greedy_insertion(self, customers):
+        return self.regret_insertion(customers, 1)
+
+    def regret_insertion_2(self, customers):
+        return self.regret_insertion(customers, 2)
+
+    def regret_insertion_3(self, customers):
+        return self.regret_insertion(customers, 3)
+
+    def regret_insertion(self, customers, k):
+        """
+        regret-k插入：每个客户在各路线的最优插入代价缓存在costs[c][r]中，插入后只需重新计算被修改的那条路线
+        选择前k个最优代价之差最大的客户插入(k=1时即为贪心插入)；所有路线都不可行时新开一条路线
+        """
+        pending = list(customers)
+        self.rng.shuffle(pending)
+        costs = {c: [self.best_insertion(c, r) for r in range(len(self.routes))] for c in pending}
+        while pending:
+            best_key, c = None, None
+            for other in pending:
+                values = sorted(cost for cost, _ in costs[other]) + [math.inf] * k
+                if values[0] == math.inf:
+                    # 已有路线都无法插入的客户优先新开路线
+                    key = (2, self.dist[0][other])
+                else:
+                    regret = sum(values[h] - values[0] for h in range(1, k))
+                    key = (1, regret, -values[0])
+                if best_key is None or key > best_key:
+                    best_key, c = key, other
+            options = costs[c]
+            r = min(range(len(options)), key=lambda h: options[h][0]) if options else -1
+            if r < 0 or options[r][0] == math.inf:
+                r, pos = len(self.routes), 1
+            else:
+                pos = options[r][1]
+            self.insert(c, r, pos)
+            pending.remove(c)
+            for other in pending:
+                if r == len(costs[other]):
+                    costs[other].append(self.best_insertion(other, r))
+                else:
+                    costs[other][r] = self.best_insertion(other, r)
+        return True
+
+    '''
+    (4)主循环
+    '''
+
+    def choose(self, weights):
+        total = sum(weights)
+        x = self.rng.random() * total
+        for h, w in enumerate(weights):
+            x -= w
+            if x <= 0:
+                return h
+        return len(weights) - 1
+
+    def solve(self, init_routes=None, time_limit=60, max_iterations=None, min_remove=5, max_remove=40,
+              segment=100, reaction=0.1, scores=(33, 9, 13), start_worse=0.05, verbose=True):
+        start_time = time.time()
+        if init_routes is None:
+            init_routes = insertion(self.points, self.capacity, self.vehicle_count)
+        self.load_routes(init_routes)
+        current_routes, current_cost = [list(r) for r in self.routes], self.cost()
+        best_routes, best_cost = current_routes, current_cost
+        # 初始温度：比当前解差start_worse的解以0.5的概率接受，只按距离计算，不含超出车辆数的惩罚
+        initial_temperature = start_worse * self.objective() / math.log(2)
+        temperature = initial_temperature
+        destroy_w, repair_w = [1.0] * len(self.destroy_ops), [1.0] * len(self.repair_ops)
+        destroy_s, repair_s = [0.0] * len(self.destroy_ops), [0.0] * len(self.repair_ops)
+        destroy_n, repair_n = [0] * len(self.destroy_ops), [0] * len(self.repair_ops)
+        n_customers = self.n - 1
+        upper = max(1, min(max_remove, int(0.4 * n_customers)))
+        lower = max(1, min(min_remove, upper))
+        iteration = 0
+        while True:
+            elapsed = time.time() - start_time
+            if elapsed >= time_limit or (max_iterations is not None and iteration >= max_iterations):
+                break
+            d, r = self.choose(destroy_w), self.choose(repair_w)
+            q = self.rng.randint(lower, upper)
+            self.load_routes(current_routes)
+            removed = self.destroy_ops[d](q)
+            self.repair_ops[r](removed)
+            new_cost = self.cost()
+            score = 0
+            if new_cost < best_cost - 1e-9:
+                best_routes, best_cost = [list(x) for x in self.routes], new_cost
+                score = scores[0]
+                if verbose:
+                    print(f'iteration {iteration}, time {elapsed:.1f}s, vehicles {len(self.routes)}, best:{best_cost}')
+            if new_cost < current_cost - 1e-9:
+                score = max(score, scores[1])
+            if new_cost < current_cost - 1e-9 or \
+                    self.rng.random() < math.exp(-(new_cost - current_cost) / max(temperature, 1e-12)):
+                if score == 0 and abs(new_cost - current_cost) > 1e-9:
+                    score = scores[2]
+                current_routes, current_cost = [list(x) for x in self.routes], new_cost
+            destroy_s[d] += score
+            repair_s[r] += score
+            destroy_n[d] += 1
+            repair_n[r] += 1
+            iteration += 1
+            if iteration % segment == 0:
+                for w, s, cnt in ((destroy_w, destroy_s, destroy_n), (repair_w, repair_s, repair_n)):
+                    for h in range(len(w)):
+                        if cnt[h]:
+                            w[h] = (1 - reaction) * w[h] + reaction * s[h] / cnt[h]
+                        w[h] = max(w[h], 0.1)
+                        s[h], cnt[h] = 0.0, 0
+            # 按用时(或迭代数)从初始温度指数下降到初始温度的1%
+            if max_iterations is not None:
+                progress = iteration / max_iterations
+            else:
+                progress = (time.time() - start_time) / time_limit
+            temperature = initial_temperature * 0.01 ** min(progress, 1.0)
+        # 返回不含惩罚的目标值
+        self.load_routes(best_routes)
+        if self.excess():
+            print(f'ALNS used {len(self.routes)} vehicles, more than {self.vehicle_count}')
+        return best_routes, self.objective()
+
+
+def draw(tours, points_list):
+    for sub in tours:
+        for i in range(len(sub)-1):
+            plt.plot([points_list[sub[i]].x, points_list[sub[i+1]].x], [points_list[sub[i]].y, points_list[sub[i+1]].y], c='red')
+            plt.scatter(points_list[sub[i]].x, points_list[sub[i]].y, c='black')
+    plt.show()
+
+
+if __name__ == '__main__':
+    file_path = sys.argv[1] if len(sys.argv) > 1 else './C101.txt'
+    point_cnt, vehicle_cnt, vehicle_cap, points_ls = read(file_path)
+    opt_tours, opt_cost = ALNS(points_ls, vehicle_cap, vehicle_cnt).solve(time_limit=60)
+    for i, t in enumerate(opt_tours):
+        print(f'route{i}:{t}', end='\n')
+    print(f'vehicles {len(opt_tours)}, distance {opt_cost}')
+    draw(opt_tours, points_ls)
@@ -0,0 +1,265 @@
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import numpy as np
+from multiprocessing import Pool, cpu_count
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+from Heuristic import read, insertion, schedule
+from ALNS import ALNS
+
+# Solomon 100客户算例的最好已知解(车辆数, 距离)，按先最小化车辆数再最小化距离的分层目标
+BKS = {
+    'C101': (10, 828.94), 'C102': (10, 828.94), 'C103': (10, 828.06), 'C104': (10, 824.78),
+    'C105': (10, 828.94), 'C106': (10, 828.94), 'C107': (10, 828.94), 'C108': (10, 828.94),
+    'C109': (10, 828.94),
+    'C201': (3, 591.56), 'C202': (3, 591.56), 'C203': (3, 591.17), 'C204': (3, 590.60),
+    'C205': (3, 588.88), 'C206': (3, 588.49), 'C207': (3, 588.29), 'C208': (3, 588.32),
+    'R101': (19, 1650.80), 'R102': (17, 1486.12), 'R103': (13, 1292.68), 'R104': (9, 1007.31),
+    'R105': (14, 1377.11), 'R106': (12, 1252.03), 'R107': (10, 1104.66), 'R108': (9, 960.88),
+    'R109': (11, 1194.73), 'R110': (10, 1118.84), 'R111': (10, 1096.72), 'R112': (9, 982.14),
+    'R201': (4, 1252.37), 'R202': (3, 1191.70), 'R203': (3, 939.50), 'R204': (2, 825.52),
+    'R205': (3, 994.42), 'R206': (3, 906.14), 'R207': (2, 890.61), 'R208': (2, 726.82),
+    'R209': (3, 909.16), 'R210': (3, 939.37), 'R211': (2, 885.71),
+    'RC101': (14, 1696.95), 'RC102': (12, 1554.75), 'RC103': (11, 1261.67), 'RC104': (10, 1135.48),
+    'RC105': (13, 1629.44), 'RC106': (11, 1424.73), 'RC107': (11, 1230.48), 'RC108': (10, 1139.82),
+    'RC201': (4, 1406.94), 'RC202': (3, 1365.64), 'RC203': (3, 1049.62), 'RC204': (3, 798.46),
+    'RC205': (4, 1297.65), 'RC206': (3, 1146.32), 'RC207': (3, 1061.14), 'RC208': (3, 828.14),
+}
+
+FIELDS = ['instance', 'solver', 'status', 'customers', 'wall_time', 'objective', 'vehicles', 'feasible',
+          'bks_vehicles', 'bks_objective', 'vehicle_gap', 'distance_gap', 'error']
+
+
+def discover(directory):
+    # 目录下所有Solomon/Homberger格式的算例文件(含单独成行的VEHICLE和CUSTOMER段标题，结果文件不会被误认)
+    files = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            with open(path, 'r') as file:
+                head = {line.strip().upper() for line in file.read(512).split('\n')}
+        except (OSError, UnicodeDecodeError):
+            continue
+        if 'VEHICLE' in head and 'CUSTOMER' in head:
+            files.append(path)
+    return files
+
+
+def load_bks(path):
+    # 额外的最好已知解表(如Homberger算例)，CSV列为instance, vehicles, objective
+    table = dict(BKS)
+    with open(path, newline='') as file:
+        for row in csv.DictReader(file):
+            table[row['instance'].upper()] = (int(row['vehicles']), float(row['objective']))
+    return table
+
+
+'''
+求解器：输入算例数据和时间限制，返回路线列表
+'''
+
+
+def solve_insertion(points_list, vehicle_count, vehicle_capacity, time_limit, iterations):
+    return insertion(points_list, vehicle_capacity, vehicle_count)
+
+
+def solve_alns(points_list, vehicle_count, vehicle_capacity, time_limit, iterations):
+    # 给定iterations时按固定迭代数运行，用时才能反映性能退化
+    routes, _ = ALNS(points_list, vehicle_capacity, vehicle_count).solve(
+        time_limit=time_limit if iterations is None else float('inf'), max_iterations=iterations, verbose=False)
+    return routes
+
+
+def solve_mip(points_list, vehicle_count, vehicle_capacity, time_limit, iterations):
+    import gurobipy as gp
+    from VRPTW import MIP_model
+    gp.setParam('TimeLimit', time_limit)
+    gp.setParam('OutputFlag', 0)
+    return MIP_model(len(points_list), vehicle_count, vehicle_capacity, points_list, warm_start=True)
+
+
+SOLVERS = {'insertion': solve_insertion, 'alns': solve_alns, 'mip': solve_mip}
+
+
+def check(routes, points_list, vehicle_count, vehicle_capacity, matrix):
+    # 路线数不超过车辆数，每个客户恰好服务一次，且每条路线满足载重和时间窗
+    if len(routes) > vehicle_count:
+        return False
+    visited = sorted(c for route in routes for c in route[1:-1])
+    if visited != list(range(1, len(points_list))):
+        return False
+    for route in routes:
+        if sum(points_list[c].demand for c in route) > vehicle_capacity:
+            return False
+        if schedule(route, points_list, matrix) is None:
+            return False
+    return True
+
+
+def bks_gap(vehicles, objective, best):
+    """
+    与分层目标的最好已知解比较：vehicle_gap为多用的车辆数，
+    只有车辆数与BKS相同时距离才可比，distance_gap为相对距离差，否则为None
+    """
+    if best is None:
+        return None, None
+    vehicle_gap = vehicles - best[0]
+    if vehicle_gap != 0:
+        return vehicle_gap, None
+    return vehicle_gap, round((objective - best[1]) / best[1], 4) + 0.0
+
+
+def run_instance(task):
+    # 单个算例出错(如MIP超时没有整数解)时返回status为error的记录，不影响其他算例
+    path, solver, time_limit, iterations, bks = task
+    name = os.path.splitext(os.path.basename(path))[0].upper()
+    start = time.perf_counter()
+    try:
+        points_count, vehicle_count, vehicle_capacity, points_list = read(path)
+        routes = SOLVERS[solver](points_list, vehicle_count, vehicle_capacity, time_limit, iterations)
+    except Exception as error:
+        row = dict.fromkeys(FIELDS)
+        row.update(instance=name, solver=solver, status='error', wall_time=round(time.perf_counter() - start, 3),
+                   error=f'{type(error).__name__}: {error}')
+        return row
+    wall_time = time.perf_counter() - start
+    matrix = np.asarray(distance_matrix([(p.x, p.y) for p in points_list]))
+    objective = float(sum(matrix[a, b] for route in routes for a, b in zip(route, route[1:])))
+    best = bks.get(name)
+    vehicle_gap, distance_gap = bks_gap(len(routes), objective, best)
+    return {
+        'instance': name,
+        'solver': solver,
+        'status': 'ok',
+        'customers': points_count - 1,
+        'wall_time': round(wall_time, 3),
+        'objective': round(objective, 2),
+        'vehicles': len(routes),
+        'feasible': check(routes, points_list, vehicle_count, vehicle_capacity, matrix),
+        'bks_vehicles': best[0] if best else None,
+        'bks_objective': best[1] if best else None,
+        'vehicle_gap': vehicle_gap,
+        'distance_gap': distance_gap,
+        'error': None,
+    }
+
+
+def run(directory, solver, time_limit=30, iterations=None, workers=None, bks=None, output='results'):
+    """
+    对目录下的所有算例并行运行求解器，每个算例一个进程，结果按算例名排序写入output.json和output.csv
+    """
+    files = discover(directory)
+    if not files:
+        raise ValueError(f'no Solomon format instance in {directory}')
+    tasks = [(path, solver, time_limit, iterations, bks or BKS) for path in files]
+    results = []
+    with Pool(min(workers or cpu_count(), len(tasks))) as pool:
+        for row in pool.imap_unordered(run_instance, tasks):
+            results.append(row)
+            if row['status'] != 'ok':
+                print(f"{row['instance']}: {row['status']}, {row['error']}")
+                continue
+            if row['vehicle_gap'] is None:
+                gap = '-'
+            elif row['vehicle_gap'] != 0:
+                gap = f"{row['vehicle_gap']:+d} vehicles"
+            else:
+                gap = f"{row['distance_gap']:.2%}"
+            print(f"{row['instance']}: time {row['wall_time']}s, vehicles {row['vehicles']}, "
+                  f"objective {row['objective']}, gap to BKS {gap}, feasible {row['feasible']}")
+    results.sort(key=lambda r: r['instance'])
+    with open(output + '.json', 'w') as file:
+        json.dump(results, file, indent=2)
+    with open(output + '.csv', 'w', newline='') as file:
+        writer = csv.DictWriter(file, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(results)
+    return results
+
+
+def load_results(path):
+    if path.endswith('.json'):
+        with open(path) as file:
+            return json.load(file)
+    with open(path, newline='') as file:
+        rows = list(csv.DictReader(file))
+    for row in rows:
+        # CSV中的空值为出错的算例
+        row['wall_time'] = float(row['wall_time']) if row['wall_time'] else None
+        row['objective'] = float(row['objective']) if row['objective'] else None
+        row['vehicles'] = int(row['vehicles']) if row['vehicles'] else None
+    return rows
+
+
+def comparable(row):
+    # 旧版结果文件没有status列
+    return row.get('status', 'ok') in ('ok', None, '') and row['objective'] is not None and row['vehicles'] is not None
+
+
+def compare(old_path, new_path, time_tolerance=0.1, objective_tolerance=0.001):
+    """
+    对比两次运行结果，用时变慢超过time_tolerance或目标值变差超过objective_tolerance(相对值)的算例标记出来
+    新结果出错而旧结果正常的算例也标记；任一方出错时不比较用时和目标值
+    返回被标记的算例列表
+    """
+    old = {r['instance']: r for r in load_results(old_path)}
+    new = {r['instance']: r for r in load_results(new_path)}
+    flagged = []
+    both = set()
+    for name in sorted(old.keys() & new.keys()):
+        a, b = old[name], new[name]
+        if not comparable(b):
+            if comparable(a):
+                flagged.append(name)
+                print(f"{name}: failed, {b.get('error')}")
+            continue
+        if not comparable(a):
+            continue
+        both.add(name)
+        notes = []
+        if b['wall_time'] > a['wall_time'] * (1 + time_tolerance):
+            notes.append(f"slower {a['wall_time']}s -> {b['wall_time']}s")
+        if b['vehicles'] > a['vehicles']:
+            notes.append(f"vehicles {a['vehicles']} -> {b['vehicles']}")
+        if b['objective'] > a['objective'] * (1 + objective_tolerance):
+            notes.append(f"objective {a['objective']} -> {b['objective']}")
+        if notes:
+            flagged.append(name)
+            print(f"{name}: {', '.join(notes)}")
+    total_old = sum(old[name]['wall_time'] for name in both)
+    total_new = sum(new[name]['wall_time'] for name in both)
+    print(f'{len(both)} instances compared, {len(flagged)} flagged, '
+          f'total time {total_old:.2f}s -> {total_new:.2f}s')
+    return flagged
+
+
+if __name__ == '__main__':
+    # run: python Benchmark.py run ./instances --solver alns --time-limit 30
+    # compare: python Benchmark.py compare old.json new.json
+    parser = argparse.ArgumentParser()
+    sub = parser.add_subparsers(dest='command', required=True)
+    run_parser = sub.add_parser('run')
+    run_parser.add_argument('directory', nargs='?', default='.')
+    run_parser.add_argument('--solver', choices=sorted(SOLVERS), default='alns')
+    run_parser.add_argument('--time-limit', type=float, default=30)
+    run_parser.add_argument('--iterations', type=int, default=None)
+    run_parser.add_argument('--workers', type=int, default=None)
+    run_parser.add_argument('--bks', default=None)
+    run_parser.add_argument('--output', default='results')
+    compare_parser = sub.add_parser('compare')
+    compare_parser.add_argument('old')
+    compare_parser.add_argument('new')
+    compare_parser.add_argument('--time-tolerance', type=float, default=0.1)
+    compare_parser.add_argument('--objective-tolerance', type=float, default=0.001)
+    args = parser.parse_args()
+    if args.command == 'run':
+        run(args.directory, args.solver, args.time_limit, args.iterations, args.workers,
+            load_bks(args.bks) if args.bks else None, args.output)
+    else:
+        sys.exit(1 if compare(args.old, args.new, args.time_tolerance, args.objective_tolerance) else 0)
@@ -0,0 +1,77 @@
+import os
+import sys
+import re
+from collections import namedtuple
+import numpy as np
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+
+Customer = namedtuple("Customer", ['index', 'x', 'y', 'demand', 'ready', 'due', 'service'])
+
+
+def read(path):
+    # Solomon/Homberger格式：第5行为车辆数和容量，第10行起每行一个点(第0个为仓库)
+    with open(path, 'r') as file:
+        data = file.read()
+    lines = data.split('\n')
+    parts = re.findall(r"\d+", lines[4])
+    vehicle_count, vehicle_capacity = int(parts[0]), int(parts[1])
+
+    points_list = []
+    points_count = 0
+    for k in range(9, len(lines)):
+        line = lines[k]
+        parts = re.findall(r"\d+", line)
+        if not parts:
+            continue
+        parts = [int(a) for a in parts]
+        points_count += 1
+        points_list.append(Customer._make(parts))
+
+    return points_count, vehicle_count, vehicle_capacity, points_list
+
+
+def schedule(route, points_list, matrix):
+    # 按路线顺序计算各点的开始服务时间，违反时间窗时返回None
+    start = [points_list[route[0]].ready]
+    for i, j in zip(route, route[1:]):
+        t = max(points_list[j].ready, start[-1] + points_list[i].service + matrix[i, j])
+        if t > points_list[j].due:
+            return None
+        start.append(t)
+    return start
+
+
+def insertion(points_list, vehicle_capacity, vehicle_count=None):
+    """
+    顺序最便宜插入：每次在当前路线中插入增加距离最小且满足时间窗和载重的客户，无法插入时开启新路线
+    新路线以离仓库最远的未服务客户开始；返回与VRPTW.MIP_model相同格式的vehicle_tours
+    """
+    matrix = np.asarray(distance_matrix([(p.x, p.y) for p in points_list]))
+    unrouted = set(range(1, len(points_list)))
+    tours = []
+    while unrouted:
+        seed = max(unrouted, key=lambda c: matrix[0, c])
+        route, load = [0, seed, 0], points_list[seed].demand
+        unrouted.remove(seed)
+        while True:
+            best = None
+            for c in unrouted:
+                if load + points_list[c].demand > vehicle_capacity:
+                    continue
+                for p in range(1, len(route)):
+                    cost = matrix[route[p - 1], c] + matrix[c, route[p]] - matrix[route[p - 1], route[p]]
+                    if best is not None and cost >= best[0]:
+                        continue
+                    if schedule(route[:p] + [c] + route[p:], points_list, matrix) is not None:
+                        best = (cost, c, p)
+            if best is None:
+                break
+            _, c, p = best
+            route.insert(p, c)
+            load += points_list[c].demand
+            unrouted.remove(c)
+        tours.append(route)
+    if vehicle_count is not None and len(tours) > vehicle_count:
+        print(f'insertion heuristic used {len(tours)} vehicles, more than {vehicle_count}')
+    return tours
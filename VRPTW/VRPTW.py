@@ -1,47 +1,77 @@
-from collections import namedtuple, defaultdict
-import re
+import os
+import sys
+from collections import defaultdict
+import numpy as np
 import gurobipy as gp
 from gurobipy import GRB
-import math
 import matplotlib.pyplot as plt
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from Common.Distance import distance_matrix
+from Common.WarmStart import set_start, incumbent_callback, report
+from Heuristic import read, insertion, schedule
 
-Customer = namedtuple("Customer", ['index', 'x', 'y', 'demand', 'ready', 'due', 'service'])
-
-
-def length(point1, point2):
-    return math.sqrt((point1.x - point2.x)**2 + (point1.y - point2.y)**2)
-
-
-def read(path):
-    with open(path, 'r') as file:
-        data = file.read()
-    lines = data.split('\n')
-    parts = re.findall(r"\d+", lines[4])
-    vehicle_count, vehicle_capacity = int(parts[0]), int(parts[1])
-
-    points_list = []
-    points_count = 0
-    for k in range(9, len(lines)):
-        line = lines[k]
-        parts = re.findall(r"\d+", line)
-        parts = [int(a) for a in parts]
-        points_count += 1
-        points_list.append(Customer._make(parts))
-
-    return points_count, vehicle_count, vehicle_capacity, points_list
-
-
-def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list):
+def preprocess(points_list, vehicle_capacity, matrix):
+    """
+    弧预处理与时间窗收紧，行驶时间与模型一致取int(d_ij)：
+    (1) ready_i + s_i + t_ij > due_j或demand_i + demand_j > capacity的弧不可能被使用，直接删除；
+    (2) 开始服务时间不早于所有可行前驱的最早到达时间：ready_j = max(ready_j, min_i(ready_i + s_i + t_ij))；
+    (3) 按最早开始时间排程时，开始服务时间不晚于max(ready_j, max_i(due_i + s_i + t_ij))
+    (2)(3)与删弧交替进行直到不再变化；回到仓库的弧在模型中没有时间约束，不参与删除和收紧
+    返回保留的弧和收紧后的ready、due
+    """
+    n = len(points_list)
+    travel = np.floor(np.asarray(matrix))
+    service = np.array([p.service for p in points_list], dtype=float)
+    demand = np.array([p.demand for p in points_list])
+    ready = np.array([p.ready for p in points_list], dtype=float)
+    due = np.array([p.due for p in points_list], dtype=float)
+    feasible = ~np.eye(n, dtype=bool)
+    overload = demand[:, None] + demand[None, :] > vehicle_capacity
+    overload[0, :] = overload[:, 0] = False
+    feasible &= ~overload
+    while True:
+        arrive = (ready + service)[:, None] + travel
+        feasible[:, 1:] &= arrive[:, 1:] <= due[None, 1:]
+        earliest = np.where(feasible, arrive, np.inf).min(axis=0)
+        latest = np.where(feasible, (due + service)[:, None] + travel, -np.inf).max(axis=0)
+        new_ready, new_due = ready.copy(), due.copy()
+        new_ready[1:] = np.maximum(ready[1:], np.minimum(due[1:], earliest[1:]))
+        new_due[1:] = np.minimum(due[1:], np.maximum(new_ready[1:], latest[1:]))
+        if np.array_equal(new_ready, ready) and np.array_equal(new_due, due):
+            break
+        ready, due = new_ready, new_due
+    edges = [(int(i), int(j)) for i, j in zip(*np.nonzero(feasible))]
+    removed = n * (n - 1) - len(edges)
+    tightened = sum(1 for p, r, d in zip(points_list, ready, due) if r > p.ready or d < p.due)
+    # 每条删除的弧(均不指向仓库)同时去掉一个时间约束和一个流量指示约束
+    print(f'preprocess: removed {removed}/{n * (n - 1)} arcs and {2 * removed} constraints, '
+          f'tightened {tightened} time windows')
+    return edges, ready.tolist(), due.tolist()
+
+
+def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list, warm_start=False, prune=True,
+              time_constraint='bigM', big_m='arc'):
     """
+    time_constraint='bigM'时时间约束使用big-M，'indicator'时使用Gurobi的指示约束
+    big_m='arc'时按弧计算M_ij，'global'时所有弧使用原来的M = 100000，用于对比根节点下界和求解时间
     (1)已知数据
     """
     points = [i for i in range(points_count)]
     customers = [i for i in range(1, points_count)]
-    edges = [(i, j) for i in range(points_count) for j in range(points_count) if i != j]
-    distance = {(i, j): length(points_list[i], points_list[j]) for i, j in edges}
+    matrix = distance_matrix([(p.x, p.y) for p in points_list])
+    if prune:
+        edges, ready, due = preprocess(points_list, vehicle_capacity, matrix)
+    else:
+        edges = [(i, j) for i in range(points_count) for j in range(points_count) if i != j]
+        ready, due = [p.ready for p in points_list], [p.due for p in points_list]
+    distance = {(i, j): float(matrix[i, j]) for i, j in edges}
     demand = [p.demand for p in points_list]
     time = [p.service for p in points_list]
-    BigM = 100000
+    # start_i <= due_i且start_j >= ready_j，所以M_ij = due_i + s_i + t_ij - ready_j即可
+    if big_m == 'global':
+        BigM = {e: 100000 for e in edges}
+    else:
+        BigM = {(i, j): max(0, due[i] + time[i] + int(distance[i, j]) - ready[j]) for i, j in edges}
     """
     (2)决策变量和目标函数
     """
@@ -72,14 +102,37 @@ def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list):
     model.addConstrs(flow[i] <= vehicle_capacity for i in customers)
 
     # (4)时间约束
-    model.addConstrs(start[i] + int(distance[(i, j)]) + time[i] - BigM * (1 - select[i, j])
-                     <= start[j] for i, j in edges if j != 0)
-    model.addConstrs(start[i] >= points_list[i].ready for i in points)
-    model.addConstrs(start[i] <= points_list[i].due for i in points)
+    if time_constraint == 'indicator':
+        model.addConstrs((select[i, j] == 1) >> (start[i] + int(distance[(i, j)]) + time[i] <= start[j])
+                         for i, j in edges if j != 0)
+    else:
+        model.addConstrs(start[i] + int(distance[(i, j)]) + time[i] - BigM[i, j] * (1 - select[i, j])
+                         <= start[j] for i, j in edges if j != 0)
+    model.addConstrs(start[i] >= ready[i] for i in points)
+    model.addConstrs(start[i] <= due[i] for i in points)
     """
     (4)求解模型
     """
-    model.optimize()
+    # warm start：插入启发式的路线作为MIP start，同时给出累计载重和开始服务时间
+    if warm_start:
+        arcs, loads, starts = {}, {}, {0: points_list[0].ready}
+        for tour in insertion(points_list, vehicle_capacity, vehicle_count):
+            # 按模型中的行驶时间int(d_ij)重新排程，得到满足收紧后时间窗的最早开始时间
+            times = schedule(tour, points_list, np.floor(matrix))
+            total = 0
+            for p, (i, j) in enumerate(zip(tour, tour[1:])):
+                arcs[i, j] = 1
+                if j != 0:
+                    total += demand[j]
+                    loads[j] = total
+                    starts[j] = times[p + 1]
+        set_start(select, arcs)
+        set_start(flow, loads)
+        set_start(start, starts)
+    model._incumbents = []
+    model.optimize(incumbent_callback)
+    report(model, f"{'warm' if warm_start else 'cold'} start, {time_constraint}"
+                  + (f', {big_m} M' if time_constraint == 'bigM' else ''))
     arcs = [e for e in edges if select[e].x > 0.99]
     hash_table = defaultdict(list)
     for e in arcs:
@@ -96,19 +149,27 @@ def MIP_model(points_count, vehicle_count, vehicle_capacity, points_list):
     return vehicle_tours
 
 
-file_path = './C101.txt'
-point_cnt, vehicle_cnt, vehicle_cap, points_ls = read(file_path)
-opt_tours = MIP_model(point_cnt, vehicle_cnt, vehicle_cap, points_ls)
-for i, t in enumerate(opt_tours):
-    print(f'route{i}:{t}', end='\n')
-
-
-def draw(tours):
+def draw(tours, points_list):
     for sub in tours:
         for i in range(len(sub)-1):
-            plt.plot([points_ls[sub[i]].x, points_ls[sub[i+1]].x], [points_ls[sub[i]].y, points_ls[sub[i+1]].y], c='red')
-            plt.scatter(points_ls[sub[i]].x, points_ls[sub[i]].y, c='black')
+            plt.plot([points_list[sub[i]].x, points_list[sub[i+1]].x], [points_list[sub[i]].y, points_list[sub[i+1]].y], c='red')
+            plt.scatter(points_list[sub[i]].x, points_list[sub[i]].y, c='black')
     plt.show()
 
 
-draw(opt_tours)
+if __name__ == '__main__':
+    # 参数：实例文件路径，加indicator时时间约束使用指示约束，加global时使用全局M = 100000(对比按弧的M)，
+    # 加cold时先不用warm start求解一次，对比找到好解和证明最优的时间
+    args = [a for a in sys.argv[1:] if a not in ('indicator', 'global', 'cold')]
+    mode = 'indicator' if 'indicator' in sys.argv[1:] else 'bigM'
+    big_m = 'global' if 'global' in sys.argv[1:] else 'arc'
+    file_path = args[0] if args else './C101.txt'
+    point_cnt, vehicle_cnt, vehicle_cap, points_ls = read(file_path)
+    if 'cold' in sys.argv[1:]:
+        MIP_model(point_cnt, vehicle_cnt, vehicle_cap, points_ls, time_constraint=mode, big_m=big_m)
+    opt_tours = MIP_model(point_cnt, vehicle_cnt, vehicle_cap, points_ls, warm_start=True, time_constraint=mode,
+                          big_m=big_m)
+    for i, t in enumerate(opt_tours):
+        print(f'route{i}:{t}', end='\n')
+    draw(opt_tours, points_ls)
+